@@ -0,0 +1,172 @@
+"""Перенос прошедших слотов и записей в архивные таблицы.
+
+    python -m app.archive                  # старше ARCHIVE_RETENTION_DAYS дней
+    python -m app.archive --days 90 --batch-size 500
+    python -m app.archive --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, and_, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.cache import availability_cache
+from app.config import get_settings
+from app.database import SessionLocal, WriterSessionLocal
+
+logger = logging.getLogger(__name__)
+
+SLOT_COLUMNS = ["expert_id", "start_at", "duration_minutes"]
+BOOKING_COLUMNS = [
+    "slot_id", "student_name", "student_email", "question", "vkr_type",
+    "magistracy", "artifacts_link", "cancellation_code", "created_at",
+]
+
+
+@dataclass
+class ArchiveResult:
+    slots: int = 0
+    bookings: int = 0
+    batches: int = 0
+
+
+def archive_before(db: Session, cutoff: datetime, batch_size: int = 1000) -> ArchiveResult:
+    """Переносит слоты с началом раньше ``cutoff`` и их записи, по ``batch_size`` слотов за транзакцию.
+
+    Каждая пачка копируется INSERT ... SELECT и удаляется из горячих таблиц в
+    одной транзакции, так что блокировки держатся недолго, а прерванный запуск
+    можно просто повторить.
+    """
+    result = ArchiveResult()
+    archived_at = datetime.utcnow()
+    while True:
+        slot_ids = list(
+            db.scalars(
+                select(models.Slot.id)
+                .where(models.Slot.start_at < cutoff)
+                .order_by(models.Slot.id)
+                .limit(batch_size)
+            )
+        )
+        if not slot_ids:
+            break
+
+        # id архивных строк выдаёт база; исходные id уходят в original_id
+        slots_source = (
+            select(
+                models.Slot.id,
+                *(models.Slot.__table__.c[name] for name in SLOT_COLUMNS),
+                models.Expert.full_name,
+                literal(archived_at, DateTime),
+            )
+            .join(models.Expert, models.Expert.id == models.Slot.expert_id)
+            .where(models.Slot.id.in_(slot_ids))
+        )
+        db.execute(
+            insert(models.ArchivedSlot).from_select(
+                ["original_id", *SLOT_COLUMNS, "expert_name", "archived_at"], slots_source
+            )
+        )
+
+        # Исходный id слота в архиве может повторяться, но в пределах одного запуска
+        # (одного archived_at) он уникален — по этой паре находим архивную строку слота
+        bookings_source = (
+            select(
+                models.Booking.id,
+                *(models.Booking.__table__.c[name] for name in BOOKING_COLUMNS),
+                models.ArchivedSlot.id,
+                literal(archived_at, DateTime),
+            )
+            .join(
+                models.ArchivedSlot,
+                and_(
+                    models.ArchivedSlot.original_id == models.Booking.slot_id,
+                    models.ArchivedSlot.archived_at == archived_at,
+                ),
+            )
+            .where(models.Booking.slot_id.in_(slot_ids))
+        )
+        bookings = db.execute(
+            insert(models.ArchivedBooking).from_select(
+                ["original_id", *BOOKING_COLUMNS, "archived_slot_id", "archived_at"], bookings_source
+            )
+        ).rowcount
+
+        db.execute(delete(models.Booking).where(models.Booking.slot_id.in_(slot_ids)))
+        db.execute(delete(models.Slot).where(models.Slot.id.in_(slot_ids)))
+        db.commit()
+
+        result.slots += len(slot_ids)
+        result.bookings += max(bookings, 0)
+        result.batches += 1
+
+    if result.slots:
+        availability_cache.invalidate()
+    return result
+
+
+def count_archivable(db: Session, cutoff: datetime) -> tuple[int, int]:
+    slots = db.scalar(select(func.count()).select_from(models.Slot).where(models.Slot.start_at < cutoff))
+    bookings = db.scalar(
+        select(func.count()).select_from(models.Booking).join(models.Slot).where(models.Slot.start_at < cutoff)
+    )
+    return slots or 0, bookings or 0
+
+
+def default_cutoff(days: int | None = None) -> datetime:
+    return datetime.utcnow() - timedelta(days=days if days is not None else get_settings().archive_retention_days)
+
+
+def run_archive(days: int | None = None, batch_size: int | None = None) -> ArchiveResult:
+    settings = get_settings()
+    db = WriterSessionLocal()
+    try:
+        return archive_before(db, default_cutoff(days), batch_size or settings.archive_batch_size)
+    finally:
+        db.close()
+
+
+async def archive_periodically(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(run_archive)
+            if result.slots:
+                logger.info("Архивировано слотов: %s, записей: %s", result.slots, result.bookings)
+        except Exception:
+            logger.exception("Ошибка архивации")
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=settings.archive_retention_days,
+                        help="архивировать слоты, начавшиеся раньше чем столько дней назад")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не переносить")
+    args = parser.parse_args()
+
+    cutoff = default_cutoff(args.days)
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            slots, bookings = count_archivable(db, cutoff)
+        finally:
+            db.close()
+        print(f"К архивации до {cutoff:%Y-%m-%d %H:%M}: слотов {slots}, записей {bookings}")
+        return
+
+    result = run_archive(args.days, args.batch_size)
+    print(f"Архивировано до {cutoff:%Y-%m-%d %H:%M}: слотов {result.slots}, записей {result.bookings}, "
+          f"пачек {result.batches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import get_route_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.cache import etag_matches
+
+try:  # brotli — необязательная зависимость; без неё отдаём gzip
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_URL = "/static"
+FINGERPRINTED_SUFFIXES = {".css", ".js"}
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".html", ".svg", ".json", ".txt"}
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+JS_IMPORT_RE = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(["'])(\.{1,2}/[^"']+?\.js)\2""")
+HTML_ASSET_RE = re.compile(r"""((?:href|src)=)(["'])(/static/[^"']+)\2""")
+
+
+@dataclass
+class Asset:
+    content: bytes
+    media_type: str
+    etag: str
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _compress(content: bytes, suffix: str) -> dict[str, bytes]:
+    if suffix not in COMPRESSIBLE_SUFFIXES or len(content) < MIN_COMPRESS_SIZE:
+        return {}
+    encodings = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(content, quality=11)
+    # Сжатый вариант храним, только если он действительно меньше
+    return {name: data for name, data in encodings.items() if len(data) < len(content)}
+
+
+def _media_type(path: Path) -> str:
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "text/javascript"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+class AssetManifest:
+    """Отпечатки статических файлов по содержимому, их сжатые версии и переписанные HTML-страницы.
+
+    ``/static/js/admin.js`` отдаётся как ``/static/js/admin.<hash>.js`` с
+    ``Cache-Control: immutable``; ссылки в HTML и относительные import'ы в JS
+    переписываются на имена с хэшем.
+    """
+
+    def __init__(self, static_dir: Path):
+        self.static_dir = static_dir
+        self.urls: dict[str, str] = {}
+        self.assets: dict[str, Asset] = {}
+        self.pages: dict[str, Asset] = {}
+
+    def build(self) -> AssetManifest:
+        for path in sorted(self.static_dir.rglob("*")):
+            if path.is_file() and path.suffix in FINGERPRINTED_SUFFIXES:
+                self._fingerprint(path, stack=())
+        for path in sorted(self.static_dir.glob("*.html")):
+            html = HTML_ASSET_RE.sub(
+                lambda match: f"{match[1]}{match[2]}{self.urls.get(match[3], match[3])}{match[2]}",
+                path.read_text(encoding="utf-8"),
+            ).encode("utf-8")
+            self.pages[path.name] = Asset(
+                content=html,
+                media_type="text/html; charset=utf-8",
+                etag=f'"{_digest(html)[:16]}"',
+                encodings=_compress(html, ".html"),
+            )
+        return self
+
+    def _url(self, path: Path) -> str:
+        return f"{STATIC_URL}/{path.relative_to(self.static_dir).as_posix()}"
+
+    def _fingerprint(self, path: Path, stack: tuple[Path, ...]) -> str:
+        url = self._url(path)
+        if url in self.urls:
+            return self.urls[url]
+        content = path.read_bytes()
+        if path.suffix == ".js" and path not in stack:
+            # Зависимости хэшируются первыми: хэш модуля учитывает имена файлов, которые он импортирует
+            def rewrite(match: re.Match) -> str:
+                target = (path.parent / match[3]).resolve()
+                if not target.is_file() or target in stack:
+                    return match[0]
+                hashed = self._fingerprint(target, stack + (path,))
+                relative = hashed.rsplit("/", 1)[1]
+                prefix = match[3].rsplit("/", 1)[0]
+                return f"{match[1]}{match[2]}{prefix}/{relative}{match[2]}"
+
+            content = JS_IMPORT_RE.sub(rewrite, content.decode("utf-8")).encode("utf-8")
+        digest = _digest(content)
+        hashed_url = f"{url[: -len(path.suffix)]}.{digest[:10]}{path.suffix}"
+        self.urls[url] = hashed_url
+        self.assets[hashed_url] = Asset(
+            content=content,
+            media_type=_media_type(path),
+            etag=f'"{digest[:16]}"',
+            encodings=_compress(content, path.suffix),
+        )
+        return hashed_url
+
+
+def choose_encoding(accept_encoding: str | None, available: dict[str, bytes]) -> str | None:
+    if not accept_encoding or not available:
+        return None
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def asset_response(request: Request, asset: Asset, cache_control: str) -> Response:
+    headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), asset.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(request.headers.get("accept-encoding"), asset.encodings)
+    body = asset.content
+    if encoding:
+        body = asset.encodings[encoding]
+        headers["Content-Encoding"] = encoding
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(status_code=200, headers=headers, media_type=asset.media_type)
+    return Response(content=body, headers=headers, media_type=asset.media_type)
+
+
+class AssetFiles:
+    """ASGI-приложение для /static: файлы с хэшем — из манифеста, остальное — из StaticFiles."""
+
+    def __init__(self, manifest: AssetManifest, fallback: ASGIApp):
+        self.manifest = manifest
+        self.fallback = fallback
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            # Внутри Mount get_route_path возвращает путь относительно /static
+            asset = self.manifest.assets.get(STATIC_URL + get_route_path(scope))
+            if asset is not None:
+                request = Request(scope, receive)
+                if request.method not in ("GET", "HEAD"):
+                    response: Response = PlainTextResponse("Method Not Allowed", status_code=405)
+                else:
+                    response = asset_response(request, asset, IMMUTABLE_CACHE_CONTROL)
+                await response(scope, receive, send)
+                return
+        await self.fallback(scope, receive, send)
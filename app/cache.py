@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+from app.config import get_settings
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    body: bytes
+    etag: str
+    created_at: float
+    # Заранее сжатые варианты тела: кодировка -> байты
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+
+class AvailabilityCache:
+    """Снимок сериализованного расписания экспертов в памяти процесса.
+
+    Любая запись в эксперты/слоты/записи увеличивает версию, и все снимки
+    старой версии перестают отдаваться. TTL нужен потому, что окно
+    ``horizon_days`` отсчитывается от текущего момента и прошедшие слоты
+    должны выпадать из выдачи даже без записей в базу.
+
+    При нескольких воркерах ``broadcast`` рассылает инвалидацию остальным
+    процессам (см. app.cluster); полученную извне инвалидацию применяют с
+    ``propagate=False``, чтобы она не ушла обратно в канал.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._version = 0
+        self._entries: dict[Hashable, Snapshot] = {}
+        self._lock = threading.Lock()
+        self.broadcast: Callable[[dict[str, Any]], None] | None = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self, propagate: bool = True) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+        if propagate and self.broadcast is not None:
+            self.broadcast({"kind": "invalidate"})
+
+    def get(self, key: Hashable) -> Snapshot | None:
+        snapshot = self._entries.get(key)
+        if snapshot is None:
+            return None
+        if snapshot.version != self._version or time.monotonic() - snapshot.created_at > self.ttl_seconds:
+            return None
+        return snapshot
+
+    def put(
+        self,
+        key: Hashable,
+        version: int,
+        body: bytes,
+        encodings: dict[str, bytes] | None = None,
+    ) -> Snapshot:
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        snapshot = Snapshot(
+            version=version,
+            body=body,
+            etag=etag,
+            created_at=time.monotonic(),
+            encodings=encodings or {},
+        )
+        with self._lock:
+            # Если пока строили снимок, данные успели измениться, — не сохраняем устаревшее
+            if version == self._version:
+                self._entries[key] = snapshot
+        return snapshot
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [item.strip() for item in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+availability_cache = AvailabilityCache(ttl_seconds=get_settings().availability_cache_ttl_seconds)
@@ -0,0 +1,205 @@
+"""Канал между воркерами: инвалидация кэша и события SSE.
+
+Каждый воркер держит свой снимок расписания (app.cache) и своих SSE-подписчиков
+(app.events). Когда запись меняет данные в одном процессе, остальные узнают об
+этом через канал:
+
+* PostgreSQL — ``LISTEN``/``NOTIFY`` на отдельном соединении, работает и между машинами;
+* иначе (SQLite) — unix datagram-сокеты в общей временной папке, по одному на воркер.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from app.cache import availability_cache
+from app.config import get_settings
+from app.events import availability_hub
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "consultations_invalidate"
+# NOTIFY ограничен 8000 байт; для сокетов держимся того же порога, чтобы не упираться в буферы
+MAX_MESSAGE_BYTES = 7900
+
+Handler = Callable[[dict[str, Any]], None]
+
+
+class Channel:
+    def start(self, loop: asyncio.AbstractEventLoop, handler: Handler) -> None:
+        raise NotImplementedError
+
+    def send(self, message: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SocketChannel(Channel):
+    """Рассылка датаграммой в сокет каждого воркера из общей папки."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path = directory / f"{os.getpid()}.sock"
+        self._sock: socket.socket | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, handler: Handler) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(str(self.path))
+        self._sock.setblocking(False)
+        self._loop = loop
+        loop.add_reader(self._sock.fileno(), self._read, handler)
+
+    def _read(self, handler: Handler) -> None:
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                return
+            handler(json.loads(data))
+
+    def send(self, message: dict[str, Any]) -> None:
+        data = json.dumps(message, ensure_ascii=False).encode()
+        for peer in self.directory.glob("*.sock"):
+            if peer == self.path:
+                continue
+            try:
+                self._sock.sendto(data, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Воркер завершился и не убрал за собой сокет
+                peer.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.warning("Очередь воркера %s переполнена, сообщение пропущено", peer.stem)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        self.path.unlink(missing_ok=True)
+
+
+class PostgresChannel(Channel):
+    """LISTEN в фоновом потоке, NOTIFY с отдельного autocommit-соединения."""
+
+    def __init__(self, database_url: str):
+        self.conninfo = database_url.replace("postgresql+psycopg://", "postgresql://", 1)
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._send_lock = threading.Lock()
+        self._sender = None
+        self._listener = None
+
+    def start(self, loop: asyncio.AbstractEventLoop, handler: Handler) -> None:
+        import psycopg
+
+        self._listener = psycopg.connect(self.conninfo, autocommit=True)
+        self._listener.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        self._sender = psycopg.connect(self.conninfo, autocommit=True)
+
+        def listen() -> None:
+            try:
+                for notify in self._listener.notifies():
+                    message = json.loads(notify.payload)
+                    if message.pop("origin", None) != self.origin:
+                        loop.call_soon_threadsafe(handler, message)
+            except psycopg.Error:
+                # Соединение закрыто при остановке воркера
+                pass
+
+        threading.Thread(target=listen, name="pg-listen", daemon=True).start()
+
+    def send(self, message: dict[str, Any]) -> None:
+        payload = json.dumps({**message, "origin": self.origin}, ensure_ascii=False)
+        with self._send_lock:
+            self._sender.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+
+    def close(self) -> None:
+        for conn in (self._listener, self._sender):
+            if conn is not None:
+                conn.close()
+
+
+def default_socket_dir(database_url: str) -> Path:
+    # Воркеры одной базы находят друг друга по общей папке
+    digest = hashlib.sha256(database_url.encode()).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"consultations-{digest}"
+
+
+def make_channel() -> Channel | None:
+    settings = get_settings()
+    kind = settings.invalidation_channel
+    if kind == "auto":
+        if settings.web_workers <= 1:
+            return None
+        kind = "postgres" if settings.database_url.startswith("postgresql") else "socket"
+    if kind == "postgres":
+        return PostgresChannel(settings.database_url)
+    if kind == "socket":
+        return SocketChannel(Path(settings.invalidation_dir or default_socket_dir(settings.database_url)))
+    return None
+
+
+def handle_message(message: dict[str, Any]) -> None:
+    if message.get("kind") == "invalidate":
+        availability_cache.invalidate(propagate=False)
+    elif message.get("kind") == "event":
+        availability_hub.deliver(message["type"], message["payload"])
+
+
+def broadcaster(channel: Channel) -> Handler:
+    def broadcast(message: dict[str, Any]) -> None:
+        if len(json.dumps(message, ensure_ascii=False).encode()) > MAX_MESSAGE_BYTES:
+            # Крупную пачку слотов не пересылаем целиком: клиенты других воркеров перечитают расписание
+            message = {"kind": "event", "type": "resync", "payload": {}}
+        try:
+            channel.send(message)
+        except Exception:
+            logger.exception("Не удалось отправить сообщение в канал воркеров")
+
+    return broadcast
+
+
+def start_channel() -> Channel | None:
+    channel = make_channel()
+    if channel is None:
+        return None
+    channel.start(asyncio.get_running_loop(), handle_message)
+    availability_cache.broadcast = availability_hub.broadcast = broadcaster(channel)
+    return channel
+
+
+def stop_channel(channel: Channel | None) -> None:
+    if channel is None:
+        return
+    availability_cache.broadcast = availability_hub.broadcast = None
+    channel.close()
+
+
+def is_primary_worker() -> bool:
+    # Фоновые задачи нужны один раз на деплой, а не в каждом воркере. Номер воркера
+    # задаёт app.serve; без него (gunicorn, uvicorn --workers) процессы не отличить
+    # друг от друга, поэтому основным не считается ни один
+    return os.getenv("WORKER_INDEX") == "0"
+
+
+def warn_without_primary(tasks: list[str]) -> None:
+    # Иначе включённые задачи молча не выполняются нигде
+    if tasks and os.getenv("WORKER_INDEX") is None:
+        logger.warning(
+            "WORKER_INDEX не задан, фоновые задачи не запущены: %s. Запускайте приложение через "
+            "python -m app.serve или задайте WORKER_INDEX=0 одному процессу",
+            ", ".join(tasks),
+        )
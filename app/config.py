@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 from pydantic import BaseModel, Field
 import os
 
@@ -8,6 +9,75 @@ class Settings(BaseModel):
     admin_token: str = Field(default_factory=lambda: os.getenv("ADMIN_TOKEN", "admin-secret"))
     expert_token: str = Field(default_factory=lambda: os.getenv("EXPERT_TOKEN", "expert-secret"))
     allowed_origins: list[str] = Field(default_factory=lambda: os.getenv("CORS_ORIGINS", "*").split(","))
+    # Запуск через `python -m app.serve`: число воркеров и адрес
+    web_workers: int = Field(default_factory=lambda: int(os.getenv("WEB_WORKERS", "1")))
+    host: str = Field(default_factory=lambda: os.getenv("HOST", "0.0.0.0"))
+    port: int = Field(default_factory=lambda: int(os.getenv("PORT", "8000")))
+    # Канал инвалидации между воркерами: auto — NOTIFY для PostgreSQL, unix-сокеты для SQLite
+    # (только при WEB_WORKERS > 1), socket/postgres — принудительно, none — выключен
+    invalidation_channel: Literal["auto", "socket", "postgres", "none"] = Field(
+        default_factory=lambda: os.getenv("INVALIDATION_CHANNEL", "auto")
+    )
+    invalidation_dir: str | None = Field(default_factory=lambda: os.getenv("INVALIDATION_DIR"))
+    # Применять миграцию при старте, если схема устарела; в многопроцессном деплое
+    # лучше выключить и запускать `python -m app.migrate` один раз перед стартом
+    auto_migrate: bool = Field(
+        default_factory=lambda: os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+    )
+    # sync — блокирующий SessionLocal в threadpool, async — AsyncSession на асинхронных драйверах
+    db_mode: Literal["sync", "async"] = Field(default_factory=lambda: os.getenv("DB_MODE", "sync"))
+    # Пул соединений SQLAlchemy
+    db_pool_size: int = Field(default_factory=lambda: int(os.getenv("DB_POOL_SIZE", "5")))
+    db_max_overflow: int = Field(default_factory=lambda: int(os.getenv("DB_MAX_OVERFLOW", "10")))
+    db_pool_timeout: float = Field(default_factory=lambda: float(os.getenv("DB_POOL_TIMEOUT", "30")))
+    db_pool_recycle: int = Field(default_factory=lambda: int(os.getenv("DB_POOL_RECYCLE", "1800")))
+    db_pool_pre_ping: bool = Field(
+        default_factory=lambda: os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    )
+    # SQLite: PRAGMA на каждом соединении и единственное соединение для записи
+    sqlite_tuning: bool = Field(
+        default_factory=lambda: os.getenv("SQLITE_TUNING", "true").lower() in ("1", "true", "yes")
+    )
+    sqlite_journal_mode: str = Field(default_factory=lambda: os.getenv("SQLITE_JOURNAL_MODE", "WAL"))
+    sqlite_busy_timeout_ms: int = Field(default_factory=lambda: int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")))
+    sqlite_synchronous: str = Field(default_factory=lambda: os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"))
+    sqlite_mmap_size: int = Field(default_factory=lambda: int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))))
+    # Отрицательное значение — в килобайтах (64 МБ)
+    sqlite_cache_size: int = Field(default_factory=lambda: int(os.getenv("SQLITE_CACHE_SIZE", "-65536")))
+    sqlite_serialized_writer: bool = Field(
+        default_factory=lambda: os.getenv("SQLITE_SERIALIZED_WRITER", "true").lower() in ("1", "true", "yes")
+    )
+    metrics_enabled: bool = Field(
+        default_factory=lambda: os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    )
+    # Профилирование SQL: медленные запросы и повторы (N+1) в лог; для одного запроса —
+    # заголовок X-Query-Profile с токеном администратора
+    query_profiling: bool = Field(
+        default_factory=lambda: os.getenv("QUERY_PROFILING", "false").lower() in ("1", "true", "yes")
+    )
+    slow_query_ms: float = Field(default_factory=lambda: float(os.getenv("SLOW_QUERY_MS", "100")))
+    n_plus_one_threshold: int = Field(default_factory=lambda: int(os.getenv("N_PLUS_ONE_THRESHOLD", "5")))
+    # Архивация прошедших консультаций; интервал 0 отключает фоновую задачу
+    archive_retention_days: int = Field(default_factory=lambda: int(os.getenv("ARCHIVE_RETENTION_DAYS", "180")))
+    archive_batch_size: int = Field(default_factory=lambda: int(os.getenv("ARCHIVE_BATCH_SIZE", "1000")))
+    archive_interval_hours: float = Field(default_factory=lambda: float(os.getenv("ARCHIVE_INTERVAL_HOURS", "0")))
+    # Outbox: доставка подтверждений и уведомлений вне запроса
+    outbox_worker: bool = Field(
+        default_factory=lambda: os.getenv("OUTBOX_WORKER", "true").lower() in ("1", "true", "yes")
+    )
+    outbox_backend: Literal["log", "file", "smtp"] = Field(default_factory=lambda: os.getenv("OUTBOX_BACKEND", "log"))
+    outbox_file: str = Field(default_factory=lambda: os.getenv("OUTBOX_FILE", "./data/outbox.jsonl"))
+    outbox_poll_seconds: float = Field(default_factory=lambda: float(os.getenv("OUTBOX_POLL_SECONDS", "2")))
+    outbox_batch_size: int = Field(default_factory=lambda: int(os.getenv("OUTBOX_BATCH_SIZE", "100")))
+    outbox_max_attempts: int = Field(default_factory=lambda: int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")))
+    # 0 — хранить доставленные сообщения бессрочно
+    outbox_retention_days: int = Field(default_factory=lambda: int(os.getenv("OUTBOX_RETENTION_DAYS", "30")))
+    smtp_host: str = Field(default_factory=lambda: os.getenv("SMTP_HOST", "localhost"))
+    smtp_port: int = Field(default_factory=lambda: int(os.getenv("SMTP_PORT", "1025")))
+    smtp_from: str = Field(default_factory=lambda: os.getenv("SMTP_FROM", "consultations@localhost"))
+    availability_cache_ttl_seconds: float = Field(
+        default_factory=lambda: float(os.getenv("AVAILABILITY_CACHE_TTL", "30"))
+    )
 
 
 @lru_cache
@@ -1,25 +1,324 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import base64
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone
 from secrets import token_hex
+from typing import Iterable, Iterator
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from pydantic import BaseModel
+from sqlalchemy import Integer, Row, Select, and_, bindparam, cast, delete, extract, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import models, schemas
+from app.cache import availability_cache
+from app.events import availability_hub
+from app.outbox import booking_payload, enqueue, enqueue_cancellations
 
 
-def get_all_experts(db: Session) -> list[models.Expert]:
-    return db.scalars(select(models.Expert).order_by(models.Expert.full_name)).unique().all()
+def encode_cursor(moment: datetime, item_id: int) -> str:
+    raw = f"{moment.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, item_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(moment), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def keyset_page(
+    db: Session,
+    stmt: Select,
+    limit: int,
+    cursor: str | None,
+    moment_column,
+    id_column,
+    descending: bool = False,
+) -> tuple[list[Row], str | None]:
+    """Страница по ключу (moment, id): сортировка, условие курсора и next_cursor.
+
+    Берём на строку больше ``limit`` — так видно, есть ли следующая страница.
+    """
+    moment, item_id = decode_cursor(cursor) if cursor else (None, None)
+    if descending:
+        stmt = stmt.order_by(moment_column.desc(), id_column.desc())
+        if cursor:
+            stmt = stmt.where(or_(moment_column < moment, and_(moment_column == moment, id_column < item_id)))
+    else:
+        stmt = stmt.order_by(moment_column, id_column)
+        if cursor:
+            stmt = stmt.where(or_(moment_column > moment, and_(moment_column == moment, id_column > item_id)))
+
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(last[moment_column.key], last[id_column.key])
+    return rows, next_cursor
+
+
+def slot_rows_query() -> Select:
+    # Слоты как строки с признаком занятости — без загрузки ORM-объектов и ленивого slot.booking
+    # Порядок колонок совпадает с полями SlotRead, чтобы строки сериализовались напрямую
+    return select(
+        models.Slot.start_at,
+        models.Slot.duration_minutes,
+        models.Slot.id,
+        models.Slot.expert_id,
+        models.Booking.id.is_(None).label("is_available"),
+    ).outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
+
+
+def columns_for(model: type[models.Base], schema: type[BaseModel]) -> list:
+    return [model.__table__.c[name] for name in schema.model_fields if name in model.__table__.c]
+
+
+def slot_event_data(slot_id: int, expert_id: int, start_at: datetime, duration_minutes: int) -> dict:
+    return {
+        "id": slot_id,
+        "expert_id": expert_id,
+        "start_at": start_at.isoformat(),
+        "duration_minutes": duration_minutes,
+    }
+
+
+# Верхняя граница длительности слота во всех схемах: по ней ограничен диапазон поиска пересечений
+MAX_SLOT_MINUTES = 240
+SlotCandidate = tuple[int, datetime, int]
+
+
+def naive_utc(value: datetime) -> datetime:
+    # Время в базе хранится без часового пояса, в UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def find_slot_overlaps(
+    db: Session,
+    candidates: list[SlotCandidate],
+    exclude_ids: Iterable[int] = (),
+) -> dict[int, schemas.SlotConflict]:
+    """Ищет пересечения слотов-кандидатов (expert_id, start_at, duration_minutes).
+
+    Один запрос по индексу (expert_id, start_at): слот длиной не больше
+    MAX_SLOT_MINUTES может пересечь кандидата, только если начинается не раньше
+    чем за MAX_SLOT_MINUTES до его начала. Кандидаты проверяются и между собой.
+    Возвращает конфликты по индексу кандидата; ``exclude_ids`` — слоты, которые
+    сейчас переносятся и на старом месте не мешают.
+    """
+    if not candidates:
+        return {}
+    normalized = [(expert_id, naive_utc(start_at), duration) for expert_id, start_at, duration in candidates]
+    lower = min(start_at for _, start_at, _ in normalized) - timedelta(minutes=MAX_SLOT_MINUTES)
+    upper = max(start_at + timedelta(minutes=duration) for _, start_at, duration in normalized)
+    stmt = select(models.Slot.id, models.Slot.expert_id, models.Slot.start_at, models.Slot.duration_minutes).where(
+        models.Slot.expert_id.in_({expert_id for expert_id, _, _ in normalized}),
+        models.Slot.start_at > lower,
+        models.Slot.start_at < upper,
+    )
+    exclude_ids = list(exclude_ids)
+    if exclude_ids:
+        stmt = stmt.where(models.Slot.id.not_in(exclude_ids))
+
+    # (начало, конец, индекс кандидата или None, id существующего слота, длительность) по экспертам
+    timelines: dict[int, list[tuple]] = defaultdict(list)
+    for row in db.execute(stmt):
+        end_at = row.start_at + timedelta(minutes=row.duration_minutes)
+        timelines[row.expert_id].append((row.start_at, end_at, None, row.id, row.duration_minutes))
+    for index, (expert_id, start_at, duration) in enumerate(normalized):
+        timelines[expert_id].append((start_at, start_at + timedelta(minutes=duration), index, None, duration))
+
+    conflicts: dict[int, schemas.SlotConflict] = {}
+
+    def add(item: tuple, other: tuple) -> None:
+        index = item[2]
+        if index not in conflicts:
+            expert_id, _, duration = normalized[index]
+            conflicts[index] = schemas.SlotConflict(
+                expert_id=expert_id, start_at=item[0], duration_minutes=duration, overlaps=[]
+            )
+        conflicts[index].overlaps.append(
+            schemas.OverlappingSlot(id=other[3], start_at=other[0], duration_minutes=other[4])
+        )
+
+    # Заметание по времени: активны интервалы, которые ещё не закончились к началу текущего
+    for timeline in timelines.values():
+        timeline.sort(key=lambda item: (item[0], item[1]))
+        active: list[tuple] = []
+        for item in timeline:
+            active = [other for other in active if other[1] > item[0]]
+            for other in active:
+                if item[2] is not None:
+                    add(item, other)
+                if other[2] is not None:
+                    add(other, item)
+            active.append(item)
+    return conflicts
+
+
+def overlap_error(conflicts: dict[int, schemas.SlotConflict]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Слоты пересекаются с уже существующими",
+            "conflicts": [conflict.model_dump(mode="json") for _, conflict in sorted(conflicts.items())],
+        },
+    )
+
+
+@contextmanager
+def slot_conflicts(db: Session) -> Iterator[None]:
+    # На PostgreSQL пересечения дополнительно запрещает ограничение ex_slots_expert_overlap
+    # (см. app.migrate) — оно ловит гонку между проверкой и записью. Ограничение отложенное
+    # и срабатывает при commit, поэтому в блок входят и сама запись, и commit
+    try:
+        yield
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Слот пересекается с уже существующим")
+
+
+def get_all_experts(db: Session) -> list[Row]:
+    return db.execute(
+        select(*columns_for(models.Expert, schemas.ExpertRead)).order_by(models.Expert.full_name)
+    ).all()
+
+
+def get_experts_with_slots(
+    db: Session,
+    min_date: datetime | None = None,
+    max_date: datetime | None = None,
+) -> list[tuple[Row, list[Row]]]:
+    # Два запроса на весь список: эксперты и слоты с признаком занятости.
+    # Фильтр по датам и сортировка выполняются в SQL по индексу (expert_id, start_at).
+    experts = db.execute(
+        select(*columns_for(models.Expert, schemas.ExpertRead)).order_by(models.Expert.full_name)
+    ).all()
+
+    stmt = slot_rows_query().order_by(models.Slot.expert_id, models.Slot.start_at)
+    if min_date:
+        stmt = stmt.where(models.Slot.start_at >= min_date)
+    if max_date:
+        stmt = stmt.where(models.Slot.start_at <= max_date)
+
+    slots_by_expert: dict[int, list[Row]] = defaultdict(list)
+    for row in db.execute(stmt):
+        slots_by_expert[row.expert_id].append(row)
+    return [(expert, slots_by_expert.get(expert.id, [])) for expert in experts]
+
+
+def get_free_slots_by_expert(
+    db: Session,
+    expert_fields: list[str],
+    date_from: datetime,
+    date_to: datetime | None = None,
+    expert_id: int | None = None,
+) -> list[tuple[Row, list[Row]]]:
+    # Только свободные слоты в окне дат; эксперты без свободных слотов в ответ не попадают
+    slots_stmt = (
+        select(models.Slot.id, models.Slot.expert_id, models.Slot.start_at, models.Slot.duration_minutes)
+        .outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
+        .where(models.Booking.id.is_(None), models.Slot.start_at >= date_from)
+        .order_by(models.Slot.expert_id, models.Slot.start_at)
+    )
+    if date_to:
+        slots_stmt = slots_stmt.where(models.Slot.start_at <= date_to)
+    if expert_id is not None:
+        slots_stmt = slots_stmt.where(models.Slot.expert_id == expert_id)
+
+    slots_by_expert: dict[int, list[Row]] = defaultdict(list)
+    for row in db.execute(slots_stmt):
+        slots_by_expert[row.expert_id].append(row)
+    if not slots_by_expert:
+        return []
+
+    columns = [models.Expert.id, *(models.Expert.__table__.c[name] for name in expert_fields)]
+    experts = db.execute(
+        select(*columns).where(models.Expert.id.in_(slots_by_expert)).order_by(models.Expert.full_name)
+    ).all()
+    return [(expert, slots_by_expert[expert.id]) for expert in experts]
+
+
+def weekday_of(column, dialect: str):
+    # День недели 0 (пн) — 6 (вс), как в SlotBatchCreate.weekdays
+    if dialect == "postgresql":
+        return cast(extract("isodow", column), Integer) - 1
+    return (cast(func.strftime("%w", column), Integer) + 6) % 7
+
+
+def minute_of_day(column, dialect: str):
+    if dialect == "postgresql":
+        return cast(extract("hour", column) * 60 + extract("minute", column), Integer)
+    return cast(func.strftime("%H", column), Integer) * 60 + cast(func.strftime("%M", column), Integer)
+
+
+def search_free_slots(
+    db: Session,
+    limit: int,
+    date_from: datetime,
+    date_to: datetime | None = None,
+    query: str | None = None,
+    min_duration: int | None = None,
+    weekdays: list[int] | None = None,
+    time_from: time | None = None,
+    time_to: time | None = None,
+) -> list[Row]:
+    # Ближайшие свободные слоты одним запросом: сортировка по start_at идёт по индексу
+    # ix_slots_start_at, и чтение останавливается на limit строк
+    dialect = db.get_bind().dialect.name
+    stmt = (
+        select(
+            models.Slot.id,
+            models.Slot.expert_id,
+            models.Slot.start_at,
+            models.Slot.duration_minutes,
+            models.Expert.full_name,
+            models.Expert.expertise_area,
+            models.Expert.meeting_room,
+        )
+        .join(models.Expert, models.Expert.id == models.Slot.expert_id)
+        .outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
+        .where(models.Booking.id.is_(None), models.Slot.start_at >= date_from)
+        .order_by(models.Slot.start_at, models.Slot.id)
+        .limit(limit)
+    )
+    if date_to:
+        stmt = stmt.where(models.Slot.start_at <= date_to)
+    if query:
+        # Каждое слово должно встретиться в имени или области экспертизы
+        for term in query.casefold().split():
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.where(models.Expert.search_text.like(f"%{escaped}%", escape="\\"))
+    if min_duration:
+        stmt = stmt.where(models.Slot.duration_minutes >= min_duration)
+    if weekdays:
+        stmt = stmt.where(weekday_of(models.Slot.start_at, dialect).in_(weekdays))
+    if time_from is not None:
+        stmt = stmt.where(minute_of_day(models.Slot.start_at, dialect) >= time_from.hour * 60 + time_from.minute)
+    if time_to is not None:
+        # Консультация должна закончиться до конца окна
+        end_minute = minute_of_day(models.Slot.start_at, dialect) + models.Slot.duration_minutes
+        stmt = stmt.where(end_minute <= time_to.hour * 60 + time_to.minute)
+    return db.execute(stmt).all()
 
 
 def create_expert(db: Session, payload: schemas.ExpertCreate) -> models.Expert:
     expert = models.Expert(**payload.model_dump())
     db.add(expert)
     db.commit()
+    availability_cache.invalidate()
     db.refresh(expert)
+    availability_hub.publish("experts_changed", expert_id=expert.id)
     return expert
 
 
@@ -32,7 +331,9 @@ def update_expert(db: Session, expert_id: int, payload: schemas.ExpertUpdate) ->
         setattr(expert, key, value)
     db.add(expert)
     db.commit()
+    availability_cache.invalidate()
     db.refresh(expert)
+    availability_hub.publish("experts_changed", expert_id=expert.id)
     return expert
 
 
@@ -42,57 +343,135 @@ def delete_expert(db: Session, expert_id: int) -> None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
     db.delete(expert)
     db.commit()
+    availability_cache.invalidate()
+    availability_hub.publish("experts_changed", expert_id=expert_id)
 
 
 def create_slot(db: Session, payload: schemas.SlotCreate) -> models.Slot:
     expert = db.get(models.Expert, payload.expert_id)
     if not expert:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
-    slot = models.Slot(**payload.model_dump())
-    db.add(slot)
-    db.commit()
+    start_at = naive_utc(payload.start_at)
+    conflicts = find_slot_overlaps(db, [(payload.expert_id, start_at, payload.duration_minutes)])
+    if conflicts:
+        raise overlap_error(conflicts)
+    slot = models.Slot(**payload.model_dump(exclude={"start_at"}), start_at=start_at)
+    with slot_conflicts(db):
+        db.add(slot)
+        db.commit()
+    availability_cache.invalidate()
     db.refresh(slot)
+    availability_hub.publish(
+        "created", slots=[slot_event_data(slot.id, slot.expert_id, slot.start_at, slot.duration_minutes)]
+    )
     return slot
 
 
-def create_slots_batch(db: Session, payload: schemas.SlotBatchCreate) -> list[models.Slot]:
-    expert = db.get(models.Expert, payload.expert_id)
-    if not expert:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
+MAX_BATCH_SLOTS = 5000
+
+
+def generate_batch_starts(payload: schemas.SlotBatchCreate) -> list[datetime]:
     if payload.end_at <= payload.start_at:
         raise HTTPException(status_code=400, detail="Конец периода должен быть позже начала")
-
     step = timedelta(minutes=payload.slot_duration_minutes)
-    total = payload.end_at - payload.start_at
-    if total < step:
-        raise HTTPException(status_code=400, detail="Период меньше длительности одного слота")
 
-    slot_count = total // step
-    remainder = total % step
-    if remainder != timedelta(0):
+    if not payload.is_recurring:
+        total = payload.end_at - payload.start_at
+        if total < step:
+            raise HTTPException(status_code=400, detail="Период меньше длительности одного слота")
+        if total % step != timedelta(0):
+            raise HTTPException(
+                status_code=400,
+                detail="Период должен делиться на длительность слота без остатка",
+            )
+        return [payload.start_at + i * step for i in range(int(total // step))]
+
+    # Повторяющееся расписание: по выбранным дням недели в окне day_start–day_end
+    weekdays = set(payload.weekdays) if payload.weekdays is not None else set(range(7))
+    tz = payload.start_at.tzinfo
+    starts: list[datetime] = []
+    day = payload.start_at.date()
+    while day <= payload.end_at.date():
+        if day.weekday() in weekdays:
+            current = datetime.combine(day, payload.day_start, tzinfo=tz)
+            day_end = datetime.combine(day, payload.day_end, tzinfo=tz)
+            while current + step <= day_end:
+                if current >= payload.start_at and current + step <= payload.end_at:
+                    starts.append(current)
+                current += step
+        day += timedelta(days=1)
+    if not starts:
+        raise HTTPException(status_code=400, detail="По заданному расписанию не получилось ни одного слота")
+    return starts
+
+
+def create_slots_batch(db: Session, payload: schemas.SlotBatchCreate) -> schemas.SlotBatchResult:
+    expert_ids = payload.target_expert_ids()
+    found = set(db.scalars(select(models.Expert.id).where(models.Expert.id.in_(expert_ids))))
+    if found != set(expert_ids):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
+
+    # Окна считаются в часовом поясе запроса, а в базу идёт UTC
+    starts = [naive_utc(start_at) for start_at in generate_batch_starts(payload)]
+    if len(starts) * len(expert_ids) > MAX_BATCH_SLOTS:
         raise HTTPException(
             status_code=400,
-            detail="Период должен делиться на длительность слота без остатка",
+            detail=f"Слишком много слотов за один запрос (максимум {MAX_BATCH_SLOTS})",
         )
 
-    created: list[models.Slot] = []
-    for i in range(int(slot_count)):
-        slot = models.Slot(
-            expert_id=payload.expert_id,
-            start_at=payload.start_at + i * step,
-            duration_minutes=payload.slot_duration_minutes,
-        )
-        db.add(slot)
-        created.append(slot)
-
-    db.commit()
-    for slot in created:
-        db.refresh(slot)
-    return created
+    rows = [
+        {"expert_id": expert_id, "start_at": start_at, "duration_minutes": payload.slot_duration_minutes}
+        for expert_id in expert_ids
+        for start_at in starts
+    ]
+    # Все сгенерированные слоты сверяются с существующими одним запросом
+    conflicts = find_slot_overlaps(db, [(row["expert_id"], row["start_at"], row["duration_minutes"]) for row in rows])
+    if conflicts:
+        raise overlap_error(conflicts)
+    # Один INSERT ... RETURNING (executemany на SQLite) вместо add + refresh на каждый слот
+    with slot_conflicts(db):
+        created = db.execute(
+            insert(models.Slot).returning(models.Slot.id, models.Slot.expert_id, models.Slot.start_at),
+            rows,
+        ).all()
+        db.commit()
+    availability_cache.invalidate()
+    slot_ids = [row.id for row in created]
+    availability_hub.publish(
+        "created",
+        slots=[
+            slot_event_data(row.id, row.expert_id, row.start_at, payload.slot_duration_minutes)
+            for row in created
+        ],
+    )
+    return schemas.SlotBatchResult(
+        created=len(slot_ids),
+        expert_ids=expert_ids,
+        first_start_at=starts[0],
+        last_start_at=starts[-1],
+        slot_ids=slot_ids,
+    )
 
 
-def get_slots(db: Session) -> list[models.Slot]:
-    return db.scalars(select(models.Slot).order_by(models.Slot.start_at)).unique().all()
+def get_slots(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    is_available: bool | None = None,
+) -> tuple[list[Row], str | None]:
+    stmt = slot_rows_query()
+    if expert_id is not None:
+        stmt = stmt.where(models.Slot.expert_id == expert_id)
+    if date_from:
+        stmt = stmt.where(models.Slot.start_at >= date_from)
+    if date_to:
+        stmt = stmt.where(models.Slot.start_at <= date_to)
+    if is_available is not None:
+        stmt = stmt.where(models.Booking.id.is_(None) if is_available else models.Booking.id.is_not(None))
+    return keyset_page(db, stmt, limit, cursor, models.Slot.start_at, models.Slot.id)
 
 
 def update_slot(db: Session, slot_id: int, payload: schemas.SlotUpdate) -> models.Slot:
@@ -102,13 +481,22 @@ def update_slot(db: Session, slot_id: int, payload: schemas.SlotUpdate) -> model
     if slot.booking:
         raise HTTPException(status_code=400, detail="Нельзя изменить занятый слот")
     data = payload.model_dump(exclude_unset=True)
-    if "start_at" in data and data["start_at"]:
-        slot.start_at = data["start_at"]
-    if "duration_minutes" in data and data["duration_minutes"]:
-        slot.duration_minutes = data["duration_minutes"]
-    db.add(slot)
-    db.commit()
+    start_at = naive_utc(data["start_at"]) if data.get("start_at") else slot.start_at
+    duration_minutes = data.get("duration_minutes") or slot.duration_minutes
+    if (start_at, duration_minutes) != (slot.start_at, slot.duration_minutes):
+        conflicts = find_slot_overlaps(db, [(slot.expert_id, start_at, duration_minutes)], exclude_ids=[slot.id])
+        if conflicts:
+            raise overlap_error(conflicts)
+    slot.start_at = start_at
+    slot.duration_minutes = duration_minutes
+    with slot_conflicts(db):
+        db.add(slot)
+        db.commit()
+    availability_cache.invalidate()
     db.refresh(slot)
+    availability_hub.publish(
+        "updated", slots=[slot_event_data(slot.id, slot.expert_id, slot.start_at, slot.duration_minutes)]
+    )
     return slot
 
 
@@ -120,9 +508,216 @@ def delete_slot(db: Session, slot_id: int) -> None:
         raise HTTPException(status_code=400, detail="Нельзя удалить занятый слот. Сначала отмените запись.")
     db.delete(slot)
     db.commit()
+    availability_cache.invalidate()
+    availability_hub.publish("deleted", slot_ids=[slot_id])
+
+
+MAX_BULK_ITEMS = 5000
+
+
+def _apply_selection(stmt: Select, selection: schemas.BulkSelection, id_column) -> Select:
+    if selection.ids:
+        stmt = stmt.where(id_column.in_(selection.ids))
+    if selection.expert_id is not None:
+        stmt = stmt.where(models.Slot.expert_id == selection.expert_id)
+    if selection.date_from:
+        stmt = stmt.where(models.Slot.start_at >= naive_utc(selection.date_from))
+    if selection.date_to:
+        stmt = stmt.where(models.Slot.start_at <= naive_utc(selection.date_to))
+    # Лишняя строка нужна только чтобы заметить превышение лимита
+    return stmt.order_by(id_column).limit(MAX_BULK_ITEMS + 1)
+
+
+def _select_bulk(db: Session, stmt: Select, selection: schemas.BulkSelection, id_column) -> list[Row]:
+    rows = db.execute(_apply_selection(stmt, selection, id_column)).all()
+    if len(rows) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Под фильтр попало больше {MAX_BULK_ITEMS} строк, сузьте его")
+    return rows
+
+
+def _bulk_slot_rows(db: Session, selection: schemas.BulkSelection) -> list[Row]:
+    stmt = select(
+        models.Slot.id,
+        models.Slot.expert_id,
+        models.Slot.start_at,
+        models.Slot.duration_minutes,
+        models.Booking.id.label("booking_id"),
+    ).outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
+    return _select_bulk(db, stmt, selection, models.Slot.id)
+
+
+def _bulk_result(
+    selection: schemas.BulkSelection,
+    rows: list[Row],
+    done: set[int],
+    conflicts: frozenset[int] | set[int] = frozenset(),
+) -> schemas.BulkResult:
+    # Пропущенные строки — занятые слоты или пересекающиеся на новом месте; id из запроса,
+    # которых нет в базе, — not_found
+    items = [
+        schemas.BulkItemResult(
+            id=row.id, status="ok" if row.id in done else "conflict" if row.id in conflicts else "booked"
+        )
+        for row in rows
+    ]
+    found = {row.id for row in rows}
+    items.extend(
+        schemas.BulkItemResult(id=item_id, status="not_found")
+        for item_id in dict.fromkeys(selection.ids)
+        if item_id not in found
+    )
+    return schemas.BulkResult(matched=len(rows), succeeded=len(done), items=items)
+
+
+def bulk_delete_slots(db: Session, payload: schemas.SlotBulkDelete) -> schemas.BulkResult:
+    # Один SELECT для отбора, затем DELETE ... WHERE id IN (...) и один commit на всю пачку
+    rows = _bulk_slot_rows(db, payload)
+    targets = [row.id for row in rows if payload.include_booked or row.booking_id is None]
+    if targets:
+        if payload.include_booked:
+            enqueue_cancellations(db, models.Booking.slot_id.in_(targets))
+            db.execute(delete(models.Booking).where(models.Booking.slot_id.in_(targets)))
+        db.execute(delete(models.Slot).where(models.Slot.id.in_(targets)))
+        db.commit()
+        availability_cache.invalidate()
+        availability_hub.publish("deleted", slot_ids=targets)
+    return _bulk_result(payload, rows, set(targets))
+
+
+def _without_overlaps(db: Session, moving: list[Row], target) -> tuple[list[Row], set[int]]:
+    # Слоты, которые на новом месте пересеклись бы с другими, остаются на старом — а значит,
+    # могут мешать остальным; повторяем проверку, пока набор не перестанет сокращаться
+    conflicts: set[int] = set()
+    while moving:
+        found = find_slot_overlaps(db, [target(row) for row in moving], exclude_ids=[row.id for row in moving])
+        if not found:
+            break
+        conflicts.update(moving[index].id for index in found)
+        moving = [row for index, row in enumerate(moving) if index not in found]
+    return moving, conflicts
+
+
+def bulk_shift_slots(db: Session, payload: schemas.SlotBulkShift) -> schemas.BulkResult:
+    # Занятые слоты не двигаем — студент записывался на конкретное время
+    rows = _bulk_slot_rows(db, payload)
+    offset = timedelta(minutes=payload.offset_minutes)
+    free, conflicts = _without_overlaps(
+        db,
+        [row for row in rows if row.booking_id is None],
+        lambda row: (row.expert_id, row.start_at + offset, row.duration_minutes),
+    )
+    if free:
+        # Новое время считаем в Python и обновляем одним executemany: выражения над датами
+        # в SQLite возвращают строку в другом формате, чем хранит SQLAlchemy
+        with slot_conflicts(db):
+            db.execute(
+                update(models.Slot.__table__).where(models.Slot.id == bindparam("slot_id")),
+                [{"slot_id": row.id, "start_at": row.start_at + offset} for row in free],
+            )
+            db.commit()
+        availability_cache.invalidate()
+        availability_hub.publish(
+            "updated",
+            slots=[slot_event_data(row.id, row.expert_id, row.start_at + offset, row.duration_minutes) for row in free],
+        )
+    return _bulk_result(payload, rows, {row.id for row in free}, conflicts)
+
+
+def bulk_reassign_slots(db: Session, payload: schemas.SlotBulkReassign) -> schemas.BulkResult:
+    if db.get(models.Expert, payload.target_expert_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
+    rows = _bulk_slot_rows(db, payload)
+    free, conflicts = _without_overlaps(
+        db,
+        [row for row in rows if row.booking_id is None],
+        lambda row: (payload.target_expert_id, row.start_at, row.duration_minutes),
+    )
+    if free:
+        free_ids = [row.id for row in free]
+        with slot_conflicts(db):
+            db.execute(
+                update(models.Slot).where(models.Slot.id.in_(free_ids)).values(expert_id=payload.target_expert_id),
+                execution_options={"synchronize_session": False},
+            )
+            db.commit()
+        availability_cache.invalidate()
+        # Для клиентов это исчезновение слота у одного эксперта и появление у другого
+        availability_hub.publish("deleted", slot_ids=free_ids)
+        availability_hub.publish(
+            "created",
+            slots=[slot_event_data(row.id, payload.target_expert_id, row.start_at, row.duration_minutes) for row in free],
+        )
+    return _bulk_result(payload, rows, {row.id for row in free}, conflicts)
+
+
+def bulk_delete_bookings(db: Session, payload: schemas.BookingBulkDelete) -> schemas.BulkResult:
+    stmt = select(
+        models.Booking.id,
+        models.Slot.id.label("slot_id"),
+        models.Slot.expert_id,
+        models.Slot.start_at,
+        models.Slot.duration_minutes,
+    ).join(models.Slot, models.Slot.id == models.Booking.slot_id)
+    rows = _select_bulk(db, stmt, payload, models.Booking.id)
+    if rows:
+        booking_ids = [row.id for row in rows]
+        enqueue_cancellations(db, models.Booking.id.in_(booking_ids))
+        db.execute(delete(models.Booking).where(models.Booking.id.in_(booking_ids)))
+        db.commit()
+        availability_cache.invalidate()
+        availability_hub.publish(
+            "freed",
+            slots=[slot_event_data(row.slot_id, row.expert_id, row.start_at, row.duration_minutes) for row in rows],
+        )
+    return _bulk_result(payload, rows, {row.id for row in rows})
+
+
+def _conflict_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    return None
+
+
+def book_slot(db: Session, slot_id: int, payload: schemas.BookingCreate) -> Row | models.Booking:
+    dialect_insert = _conflict_insert(db)
+    if dialect_insert is None:
+        return _book_slot_orm(db, slot_id, payload)
+
+    # Слот захватывается одним запросом без предварительного чтения:
+    # INSERT ... SELECT FROM slots WHERE id = :slot_id ON CONFLICT (slot_id) DO NOTHING RETURNING.
+    # Победитель гонки получает строку, остальные — пустой результат без ошибки и отката.
+    values = {
+        "cancellation_code": token_hex(3),
+        "created_at": datetime.utcnow(),
+        **payload.model_dump(),
+    }
+    source = select(
+        models.Slot.id,
+        *(literal(value, type_=models.Booking.__table__.c[key].type) for key, value in values.items()),
+    ).where(models.Slot.id == slot_id)
+    stmt = (
+        dialect_insert(models.Booking)
+        .from_select(["slot_id", *values.keys()], source)
+        .on_conflict_do_nothing(index_elements=["slot_id"])
+        .returning(*models.Booking.__table__.c)
+    )
+    booking = db.execute(stmt).first()
+    if booking is not None:
+        enqueue(db, "booking.created", booking_payload(db, booking))
+    db.commit()
+    if booking is None:
+        if db.get(models.Slot, slot_id) is None:
+            raise HTTPException(status_code=404, detail="Слот не найден")
+        raise HTTPException(status_code=400, detail="Слот уже занят")
+    availability_cache.invalidate()
+    availability_hub.publish("booked", slot_ids=[slot_id])
+    return booking
 
 
-def book_slot(db: Session, slot_id: int, payload: schemas.BookingCreate) -> models.Booking:
+def _book_slot_orm(db: Session, slot_id: int, payload: schemas.BookingCreate) -> models.Booking:
     slot = db.get(models.Slot, slot_id)
     if not slot:
         raise HTTPException(status_code=404, detail="Слот не найден")
@@ -136,10 +731,14 @@ def book_slot(db: Session, slot_id: int, payload: schemas.BookingCreate) -> mode
     )
     db.add(booking)
     try:
+        db.flush()
+        enqueue(db, "booking.created", booking_payload(db, booking))
         db.commit()
+        availability_cache.invalidate()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Слот уже занят")
+    availability_hub.publish("booked", slot_ids=[slot_id])
     db.refresh(booking)
     return booking
 
@@ -150,30 +749,186 @@ def delete_booking_as_student(db: Session, booking_id: int, cancellation_code: s
         raise HTTPException(status_code=404, detail="Запись не найдена")
     if booking.cancellation_code != cancellation_code:
         raise HTTPException(status_code=403, detail="Неверный код отмены")
-    db.delete(booking)
-    db.commit()
+    _delete_booking(db, booking)
 
 
 def delete_booking_as_admin(db: Session, booking_id: int) -> None:
     booking = db.get(models.Booking, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Запись не найдена")
+    _delete_booking(db, booking)
+
+
+def _delete_booking(db: Session, booking: models.Booking) -> None:
+    slot = booking.slot
+    freed = slot_event_data(slot.id, slot.expert_id, slot.start_at, slot.duration_minutes)
+    enqueue(db, "booking.cancelled", booking_payload(db, booking))
     db.delete(booking)
     db.commit()
+    availability_cache.invalidate()
+    availability_hub.publish("freed", slots=[freed])
+
+
+def list_bookings(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> tuple[list[Row], str | None]:
+    # Новые записи первыми; курсор — (created_at, id) последней отданной записи
+    stmt = select(*columns_for(models.Booking, schemas.BookingRead))
+    if expert_id is not None or date_from or date_to:
+        stmt = stmt.join(models.Slot)
+    if expert_id is not None:
+        stmt = stmt.where(models.Slot.expert_id == expert_id)
+    if date_from:
+        stmt = stmt.where(models.Slot.start_at >= date_from)
+    if date_to:
+        stmt = stmt.where(models.Slot.start_at <= date_to)
+    return keyset_page(db, stmt, limit, cursor, models.Booking.created_at, models.Booking.id, descending=True)
+
+
+def list_bookings_by_expert(db: Session, expert_id: int) -> list[Row]:
+    stmt = (
+        select(*columns_for(models.Booking, schemas.BookingRead))
+        .join(models.Slot)
+        .where(models.Slot.expert_id == expert_id)
+        .order_by(models.Slot.start_at)
+    )
+    return db.execute(stmt).all()
+
+
+def get_expert_schedule(
+    db: Session,
+    expert_id: int,
+    date_from: datetime,
+    date_to: datetime,
+) -> tuple[Row, list[Row]]:
+    # Слоты эксперта вместе с записями одним запросом по индексу (expert_id, start_at);
+    # колонки записи идут с префиксом booking_
+    expert = db.execute(
+        select(*columns_for(models.Expert, schemas.ExpertRead)).where(models.Expert.id == expert_id)
+    ).first()
+    if expert is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Эксперт не найден")
+    booking_columns = [column.label(f"booking_{column.name}") for column in columns_for(models.Booking, schemas.ScheduleBooking)]
+    stmt = (
+        slot_rows_query()
+        .add_columns(*booking_columns)
+        .where(
+            models.Slot.expert_id == expert_id,
+            models.Slot.start_at >= date_from,
+            models.Slot.start_at <= date_to,
+        )
+        .order_by(models.Slot.start_at)
+    )
+    return expert, db.execute(stmt).all()
 
 
-def list_bookings(db: Session) -> list[models.Booking]:
-    return db.scalars(select(models.Booking).order_by(models.Booking.created_at.desc())).unique().all()
+def _export_filters(stmt: Select, expert_id: int | None, date_from: datetime | None, date_to: datetime | None) -> Select:
+    if expert_id is not None:
+        stmt = stmt.where(models.Slot.expert_id == expert_id)
+    if date_from:
+        stmt = stmt.where(models.Slot.start_at >= date_from)
+    if date_to:
+        stmt = stmt.where(models.Slot.start_at <= date_to)
+    return stmt.order_by(models.Slot.start_at, models.Slot.id)
 
 
-def list_bookings_by_expert(db: Session, expert_id: int) -> list[models.Booking]:
+def export_bookings_query(
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> Select:
+    # Записи вместе со слотом и экспертом; код отмены в выгрузку не попадает
     stmt = (
-        select(models.Booking)
-        .join(models.Slot)
-        .where(models.Slot.expert_id == expert_id)
-        .order_by(models.Slot.start_at)
+        select(
+            models.Booking.id,
+            models.Booking.created_at,
+            models.Booking.student_name,
+            models.Booking.student_email,
+            models.Booking.question,
+            models.Booking.vkr_type,
+            models.Booking.magistracy,
+            models.Booking.artifacts_link,
+            models.Slot.id.label("slot_id"),
+            models.Slot.start_at,
+            models.Slot.duration_minutes,
+            models.Expert.id.label("expert_id"),
+            models.Expert.full_name.label("expert_name"),
+            models.Expert.expertise_area,
+        )
+        .join(models.Slot, models.Booking.slot_id == models.Slot.id)
+        .join(models.Expert, models.Slot.expert_id == models.Expert.id)
+    )
+    return _export_filters(stmt, expert_id, date_from, date_to)
+
+
+def export_slots_query(
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> Select:
+    stmt = (
+        select(
+            models.Slot.id,
+            models.Slot.start_at,
+            models.Slot.duration_minutes,
+            models.Expert.id.label("expert_id"),
+            models.Expert.full_name.label("expert_name"),
+            models.Expert.expertise_area,
+            models.Booking.id.is_(None).label("is_available"),
+            models.Booking.id.label("booking_id"),
+            models.Booking.student_name,
+            models.Booking.student_email,
+        )
+        .join(models.Expert, models.Slot.expert_id == models.Expert.id)
+        .outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
+    )
+    return _export_filters(stmt, expert_id, date_from, date_to)
+
+
+def list_archived_slots(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> tuple[list[Row], str | None]:
+    # Архив читается от свежих консультаций к старым, курсор — (start_at, id)
+    stmt = select(*columns_for(models.ArchivedSlot, schemas.ArchivedSlotRead))
+    if expert_id is not None:
+        stmt = stmt.where(models.ArchivedSlot.expert_id == expert_id)
+    if date_from:
+        stmt = stmt.where(models.ArchivedSlot.start_at >= date_from)
+    if date_to:
+        stmt = stmt.where(models.ArchivedSlot.start_at <= date_to)
+    return keyset_page(db, stmt, limit, cursor, models.ArchivedSlot.start_at, models.ArchivedSlot.id, descending=True)
+
+
+def list_archived_bookings(
+    db: Session,
+    limit: int,
+    cursor: str | None = None,
+    expert_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> tuple[list[Row], str | None]:
+    stmt = select(*columns_for(models.ArchivedBooking, schemas.ArchivedBookingRead))
+    if expert_id is not None or date_from or date_to:
+        stmt = stmt.join(models.ArchivedSlot, models.ArchivedSlot.id == models.ArchivedBooking.archived_slot_id)
+    if expert_id is not None:
+        stmt = stmt.where(models.ArchivedSlot.expert_id == expert_id)
+    if date_from:
+        stmt = stmt.where(models.ArchivedSlot.start_at >= date_from)
+    if date_to:
+        stmt = stmt.where(models.ArchivedSlot.start_at <= date_to)
+    return keyset_page(
+        db, stmt, limit, cursor, models.ArchivedBooking.created_at, models.ArchivedBooking.id, descending=True
     )
-    return db.scalars(stmt).unique().all()
 
 
 def update_booking_admin(db: Session, booking_id: int, payload: schemas.BookingAdminUpdate) -> models.Booking:
@@ -182,17 +937,26 @@ def update_booking_admin(db: Session, booking_id: int, payload: schemas.BookingA
         raise HTTPException(status_code=404, detail="Запись не найдена")
 
     data = payload.model_dump(exclude_unset=True)
+    freed = None
     if "slot_id" in data and data["slot_id"] != booking.slot_id:
         new_slot = db.get(models.Slot, data["slot_id"])
         if not new_slot:
             raise HTTPException(status_code=404, detail="Новый слот не найден")
         if new_slot.booking:
             raise HTTPException(status_code=400, detail="Новый слот уже занят")
+        old_slot = booking.slot
+        freed = slot_event_data(old_slot.id, old_slot.expert_id, old_slot.start_at, old_slot.duration_minutes)
         booking.slot_id = data["slot_id"]
     if "question" in data and data["question"]:
         booking.question = data["question"]
 
+    if freed:
+        enqueue(db, "booking.moved", booking_payload(db, booking, slot_id=data["slot_id"]))
     db.add(booking)
     db.commit()
+    availability_cache.invalidate()
+    if freed:
+        availability_hub.publish("freed", slots=[freed])
+        availability_hub.publish("booked", slot_ids=[data["slot_id"]])
     db.refresh(booking)
     return booking
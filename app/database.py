@@ -1,11 +1,26 @@
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from typing import Callable, TypeVar
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.pool_stats import (
+    PoolStats,
+    async_pool_stats,
+    async_writer_pool_stats,
+    instrument_engine,
+    sync_pool_stats,
+    sync_writer_pool_stats,
+    timed_pool_class,
+)
 
 
 settings = get_settings()
+T = TypeVar("T")
 
 # Создаем папку data, если используем SQLite и папка не существует
 if settings.database_url.startswith("sqlite"):
@@ -33,9 +48,105 @@ if database_url.startswith("postgresql://") and not database_url.startswith("pos
     # Заменяем на postgresql+psycopg:// для использования psycopg3
     database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
 
-engine = create_engine(database_url, connect_args=connect_args)
+# Настройки пула берутся из Settings; для SQLite в памяти SQLAlchemy использует
+# однопоточный пул, которому эти параметры не подходят
+pool_kwargs = {}
+if ":memory:" not in database_url:
+    pool_kwargs = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+is_sqlite = database_url.startswith("sqlite")
+# Отдельный писатель имеет смысл только для файловой SQLite: у неё одна блокировка записи на базу
+use_writer = is_sqlite and settings.sqlite_serialized_writer and bool(pool_kwargs)
+# Один писатель: остальные записи ждут в очереди пула, а не получают "database is locked"
+writer_pool_kwargs = {**pool_kwargs, "pool_size": 1, "max_overflow": 0}
+
+
+def sqlite_pragmas() -> list[str]:
+    if not settings.sqlite_tuning:
+        return []
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+    ]
+
+
+def apply_sqlite_pragmas(target: Engine) -> None:
+    # WAL: читатели не ждут писателя; busy_timeout: писатель из другого процесса ждёт, а не падает
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(target, "connect")
+    def set_pragmas(dbapi_connection, _record) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def make_engine(kwargs: dict, stats: PoolStats) -> Engine:
+    created = create_engine(
+        database_url,
+        connect_args=connect_args,
+        **(kwargs and {**kwargs, "poolclass": timed_pool_class(QueuePool, stats)}),
+    )
+    instrument_engine(created, stats)
+    if is_sqlite:
+        apply_sqlite_pragmas(created)
+    return created
+
+
+engine = make_engine(pool_kwargs, sync_pool_stats)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Записи (эндпоинты POST/PATCH/DELETE, архивация, outbox) идут через writer_engine
+writer_engine = make_engine(writer_pool_kwargs, sync_writer_pool_stats) if use_writer else engine
+WriterSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=writer_engine) if use_writer else SessionLocal
+)
+
+# Асинхронный режим (DB_MODE=async): тот же URL, но асинхронные драйверы —
+# aiosqlite для SQLite, psycopg (async) для PostgreSQL
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+async_writer_engine: AsyncEngine | None = None
+AsyncWriterSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+
+def make_async_engine(kwargs: dict, stats: PoolStats) -> AsyncEngine:
+    async_database_url = database_url
+    if async_database_url.startswith("sqlite:"):
+        async_database_url = async_database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    created = create_async_engine(
+        async_database_url,
+        connect_args=connect_args,
+        **(kwargs and {**kwargs, "poolclass": timed_pool_class(AsyncAdaptedQueuePool, stats)}),
+    )
+    instrument_engine(created.sync_engine, stats)
+    if is_sqlite:
+        apply_sqlite_pragmas(created.sync_engine)
+    return created
+
+
+if settings.db_mode == "async":
+    async_engine = make_async_engine(pool_kwargs, async_pool_stats)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=True)
+    async_writer_engine = make_async_engine(writer_pool_kwargs, async_writer_pool_stats) if use_writer else async_engine
+    AsyncWriterSessionLocal = (
+        async_sessionmaker(async_writer_engine, autoflush=False, expire_on_commit=True)
+        if use_writer
+        else AsyncSessionLocal
+    )
+
 
 class Base(DeclarativeBase):
     pass
@@ -47,3 +158,40 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_write_db():
+    db = WriterSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_write_db():
+    async with AsyncWriterSessionLocal() as db:
+        yield db
+
+
+AnySession = Session | AsyncSession
+
+# Зависимости, которые используют эндпоинты: выбираются по DB_MODE.
+# get_write_session — для изменяющих запросов; без отдельного писателя это тот же пул.
+get_session = get_async_db if settings.db_mode == "async" else get_db
+get_write_session = get_async_write_db if settings.db_mode == "async" else get_write_db
+
+
+async def run_db(db: AnySession, fn: Callable[..., T], *args, **kwargs) -> T:
+    """Выполняет синхронную функцию из crud с подходящей сессией.
+
+    В асинхронном режиме функция работает внутри ``AsyncSession.run_sync``
+    без потока из пула; в синхронном — в threadpool Starlette, как раньше.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
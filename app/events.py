@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from typing import Any, Callable
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        # Клиент не успевал читать и часть событий потеряна — ему нужно перечитать расписание
+        self.overflowed = False
+
+    def push(self, message: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+
+class AvailabilityHub:
+    """Рассылка изменений слотов всем подключённым клиентам внутри процесса.
+
+    ``publish`` вызывается из crud — из потока threadpool или из цикла событий,
+    поэтому сообщения доставляются в очереди подписчиков через call_soon_threadsafe.
+    События из других воркеров приходят через ``deliver``.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.broadcast: Callable[[dict[str, Any]], None] | None = None
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, **payload: Any) -> None:
+        self.deliver(event_type, payload)
+        if self.broadcast is not None:
+            self.broadcast({"kind": "event", "type": event_type, "payload": payload})
+
+    def deliver(self, event_type: str, payload: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+            # id нумеруются в каждом процессе отдельно — клиент привязан к одному воркеру
+            message = {"id": next(self._sequence), "type": event_type, **payload}
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, message)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                self.unsubscribe(subscriber)
+
+
+availability_hub = AvailabilityHub()
@@ -0,0 +1,89 @@
+"""Потоковая выгрузка записей и расписания в CSV или NDJSON.
+
+Строки читаются курсором пачками по EXPORT_BATCH_SIZE (``yield_per``; для
+PostgreSQL — серверный курсор) и сразу кодируются в ответ, поэтому память не
+зависит от размера таблицы. Сессия открывается самим потоком: зависимость
+запроса закрывается раньше, чем отправлено тело ответа.
+"""
+from __future__ import annotations
+
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterator, Literal, Sequence
+
+from pydantic_core import to_json
+from sqlalchemy import Select
+from starlette.responses import StreamingResponse
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, SessionLocal
+
+ExportFormat = Literal["csv", "ndjson"]
+
+EXPORT_BATCH_SIZE = 1000
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+# BOM нужен Excel, чтобы открыть CSV с кириллицей в UTF-8
+CSV_BOM = "\ufeff"
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class Encoder:
+    def __init__(self, fmt: ExportFormat, keys: Sequence[str]):
+        self.fmt = fmt
+        self.keys = list(keys)
+
+    def header(self) -> bytes:
+        if self.fmt == "ndjson":
+            return b""
+        return (CSV_BOM + self._csv_lines([self.keys])).encode()
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if self.fmt == "ndjson":
+            return b"".join(to_json(dict(zip(self.keys, row))) + b"\n" for row in rows)
+        return self._csv_lines([_csv_value(value) for value in row] for row in rows).encode()
+
+    @staticmethod
+    def _csv_lines(rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue()
+
+
+def stream_sync(stmt: Select, fmt: ExportFormat) -> Iterator[bytes]:
+    # StreamingResponse вызывает next() в threadpool, поэтому блокирующий курсор не держит цикл событий
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        encoder = Encoder(fmt, result.keys())
+        yield encoder.header()
+        for partition in result.partitions():
+            yield encoder.rows(partition)
+    finally:
+        db.close()
+
+
+async def stream_async(stmt: Select, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        encoder = Encoder(fmt, result.keys())
+        yield encoder.header()
+        async for partition in result.partitions():
+            yield encoder.rows(partition)
+
+
+def export_response(stmt: Select, fmt: ExportFormat, name: str) -> StreamingResponse:
+    stream = stream_async(stmt, fmt) if get_settings().db_mode == "async" else stream_sync(stmt, fmt)
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
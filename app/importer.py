@@ -0,0 +1,335 @@
+"""Импорт экспертов и их расписания из CSV, JSON или NDJSON.
+
+    python -m app.importer cohort.csv
+    python -m app.importer cohort.json --dry-run
+
+CSV — одна строка на окно расписания: колонки эксперта (full_name,
+expertise_area, bio, contact_info, meeting_room) и окна (start_at, end_at,
+duration_minutes); строка без start_at только создаёт или обновляет эксперта.
+В JSON/NDJSON у объекта эксперта может быть список окон ``slots``.
+
+Эксперты сопоставляются по full_name: существующий обновляется, новый
+создаётся. Файл читается и проверяется построчно по правилам ExpertCreate и
+SlotWindow, записи пишутся пачками (COPY на PostgreSQL, executemany на SQLite)
+в одной транзакции; слоты, пересекающиеся с существующими или друг с другом,
+считаются ошибкой строки. Если хотя бы одна строка с ошибкой, ничего не сохраняется;
+в режиме --dry-run транзакция откатывается всегда.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Literal
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.cache import availability_cache
+from app.database import WriterSessionLocal
+from app.events import availability_hub
+
+ImportFormat = Literal["csv", "json", "ndjson"]
+
+IMPORT_CHUNK_SIZE = 500
+MAX_WINDOW_SLOTS = 1000
+MAX_REPORTED_ERRORS = 1000
+EXPERT_FIELDS = tuple(schemas.ExpertCreate.model_fields)
+WINDOW_FIELDS = ("start_at", "end_at", "duration_minutes")
+
+
+def detect_format(filename: str | None, default: ImportFormat = "csv") -> ImportFormat:
+    suffix = Path(filename or "").suffix.lower().lstrip(".")
+    if suffix == "jsonl":
+        return "ndjson"
+    return suffix if suffix in ("csv", "json", "ndjson") else default
+
+
+def read_records(stream: BinaryIO, fmt: ImportFormat) -> Iterator[tuple[int, dict[str, Any] | ValueError]]:
+    """Отдаёт (номер строки, запись); нечитаемая строка приходит как ValueError."""
+    if fmt == "json":
+        # Обычный JSON нельзя разобрать по частям без сторонних библиотек — для больших файлов есть NDJSON
+        try:
+            data = json.load(stream)
+        except ValueError as error:
+            yield 1, ValueError(f"Некорректный JSON: {error}")
+            return
+        for number, record in enumerate(data if isinstance(data, list) else [data], start=1):
+            yield number, record if isinstance(record, dict) else ValueError("Ожидался объект")
+        return
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "ndjson":
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield number, ValueError(f"Некорректный JSON: {error}")
+                continue
+            yield number, record if isinstance(record, dict) else ValueError("Ожидался объект")
+        return
+
+    # Первая строка CSV — заголовок; пустые ячейки считаются отсутствующими
+    for number, row in enumerate(csv.DictReader(text), start=2):
+        yield number, {key.strip(): value.strip() or None for key, value in row.items() if key and value is not None}
+
+
+def _error_messages(error: ValidationError, prefix: str = "") -> list[str]:
+    return [f"{prefix}{'.'.join(map(str, item['loc'])) or 'запись'}: {item['msg']}" for item in error.errors()]
+
+
+def _windows(record: dict[str, Any]) -> list[Any]:
+    if "slots" in record:
+        return record["slots"] if isinstance(record["slots"], list) else [record["slots"]]
+    if record.get("start_at"):
+        return [{key: record[key] for key in WINDOW_FIELDS if record.get(key) is not None}]
+    return []
+
+
+def window_starts(window: schemas.SlotWindow) -> list[datetime]:
+    start_at = crud.naive_utc(window.start_at)
+    if window.end_at is None:
+        return [start_at]
+    end_at = crud.naive_utc(window.end_at)
+    step = timedelta(minutes=window.duration_minutes)
+    starts = []
+    current = start_at
+    while current + step <= end_at:
+        starts.append(current)
+        current += step
+    return starts
+
+
+def validate_record(record: dict[str, Any]) -> tuple[schemas.ExpertCreate | None, list[tuple[datetime, int]], list[str]]:
+    errors: list[str] = []
+    expert = None
+    try:
+        # Отсутствующие поля не передаём: при обновлении эксперта они останутся прежними
+        expert = schemas.ExpertCreate.model_validate({key: record[key] for key in EXPERT_FIELDS if key in record})
+    except ValidationError as error:
+        errors += _error_messages(error)
+
+    slots: list[tuple[datetime, int]] = []
+    for index, raw in enumerate(_windows(record)):
+        prefix = f"slots.{index}." if "slots" in record else ""
+        try:
+            window = schemas.SlotWindow.model_validate(raw)
+        except ValidationError as error:
+            errors += _error_messages(error, prefix)
+            continue
+        window_slots = window_starts(window)
+        if not window_slots:
+            errors.append(f"{prefix}end_at: окно короче одного слота")
+        elif len(window_slots) > MAX_WINDOW_SLOTS:
+            errors.append(f"{prefix}end_at: больше {MAX_WINDOW_SLOTS} слотов в одном окне")
+        else:
+            slots += [(start_at, window.duration_minutes) for start_at in window_slots]
+    return expert, slots, errors
+
+
+class _ImportRun:
+    def __init__(self, db: Session, dry_run: bool):
+        self.db = db
+        self.dry_run = dry_run
+        # full_name -> id; None — эксперт новый, но ещё не записан (из-за ошибок в файле)
+        self.expert_ids: dict[str, int | None] = {}
+        self.rows = 0
+        self.experts_created = 0
+        self.experts_updated = 0
+        self.slots_created = 0
+        self.errors: list[schemas.ImportRowError] = []
+        self.errors_total = 0
+
+    def add_error(self, row: int, messages: list[str]) -> None:
+        self.errors_total += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(schemas.ImportRowError(row=row, errors=messages))
+
+    def flush(self, chunk: list[tuple[int, schemas.ExpertCreate, list[tuple[datetime, int]]]]) -> None:
+        if not chunk:
+            return
+        # После первой ошибки файл только проверяется до конца: транзакцию всё равно откатим
+        write = self.errors_total == 0
+        names = {expert.full_name for _, expert, _ in chunk} - self.expert_ids.keys()
+        existing: dict[str, int] = {}
+        if names:
+            rows = self.db.execute(
+                select(models.Expert.id, models.Expert.full_name)
+                .where(models.Expert.full_name.in_(names))
+                .order_by(models.Expert.id)
+            )
+            for row in rows:
+                existing.setdefault(row.full_name, row.id)
+
+        to_insert: list[dict[str, Any]] = []
+        to_update: list[dict[str, Any]] = []
+        for _, expert, _ in chunk:
+            if expert.full_name in self.expert_ids:
+                continue
+            search_text = models.expert_search_text(expert.full_name, expert.expertise_area)
+            if expert.full_name in existing:
+                self.expert_ids[expert.full_name] = existing[expert.full_name]
+                to_update.append(
+                    {"id": existing[expert.full_name], **expert.model_dump(exclude_unset=True), "search_text": search_text}
+                )
+            else:
+                self.expert_ids[expert.full_name] = None
+                to_insert.append({**expert.model_dump(), "search_text": search_text})
+        self.experts_created += len(to_insert)
+        self.experts_updated += len(to_update)
+
+        if write and to_update:
+            self.db.execute(update(models.Expert), to_update)
+        if write and to_insert:
+            created = self.db.execute(
+                insert(models.Expert).returning(models.Expert.id, models.Expert.full_name),
+                to_insert,
+            )
+            for row in created:
+                self.expert_ids[row.full_name] = row.id
+
+        slots = [
+            (self.expert_ids[expert.full_name], start_at, duration)
+            for _, expert, expert_slots in chunk
+            for start_at, duration in expert_slots
+        ]
+        row_numbers = [number for number, _, expert_slots in chunk for _ in expert_slots]
+        self.slots_created += len(slots)
+        if not write or not slots:
+            return
+        # Пересечения с уже сохранёнными слотами (в том числе из прошлых пачек файла) и внутри пачки
+        conflicts = crud.find_slot_overlaps(self.db, slots)
+        if conflicts:
+            messages: dict[int, list[str]] = {}
+            for index, conflict in sorted(conflicts.items()):
+                overlaps = ", ".join(
+                    f"{item.start_at:%Y-%m-%d %H:%M}" + (f" (слот {item.id})" if item.id else "")
+                    for item in conflict.overlaps
+                )
+                messages.setdefault(row_numbers[index], []).append(
+                    f"start_at: слот {conflict.start_at:%Y-%m-%d %H:%M} пересекается с {overlaps}"
+                )
+            for number, row_messages in messages.items():
+                self.add_error(number, row_messages)
+            return
+        with crud.slot_conflicts(self.db):
+            insert_slots(self.db, slots)
+
+    def result(self, committed: bool) -> schemas.ImportResult:
+        return schemas.ImportResult(
+            dry_run=self.dry_run,
+            committed=committed,
+            rows=self.rows,
+            experts_created=self.experts_created,
+            experts_updated=self.experts_updated,
+            slots_created=self.slots_created,
+            errors=self.errors,
+            errors_truncated=self.errors_total > len(self.errors),
+        )
+
+
+def insert_slots(db: Session, slots: list[tuple[int, datetime, int]]) -> None:
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg":
+        # COPY в той же транзакции, что и вставка экспертов
+        from psycopg import errors
+
+        statement = "COPY slots (expert_id, start_at, duration_minutes) FROM STDIN"
+        driver_connection = db.connection().connection.driver_connection
+        try:
+            with driver_connection.cursor() as cursor:
+                with cursor.copy(statement) as copy:
+                    for row in slots:
+                        copy.write_row(row)
+        except errors.IntegrityError as error:
+            # COPY идёт мимо SQLAlchemy — приводим ошибку драйвера к общему виду
+            raise IntegrityError(statement, None, error) from error
+        return
+    db.execute(
+        insert(models.Slot),
+        [{"expert_id": expert_id, "start_at": start_at, "duration_minutes": duration} for expert_id, start_at, duration in slots],
+    )
+
+
+def import_records(
+    db: Session,
+    records: Iterable[tuple[int, dict[str, Any] | ValueError]],
+    dry_run: bool = False,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> schemas.ImportResult:
+    run = _ImportRun(db, dry_run)
+    chunk: list[tuple[int, schemas.ExpertCreate, list[tuple[datetime, int]]]] = []
+    try:
+        for number, record in records:
+            run.rows += 1
+            if isinstance(record, ValueError):
+                run.add_error(number, [str(record)])
+                continue
+            expert, slots, errors = validate_record(record)
+            if errors:
+                run.add_error(number, errors)
+                continue
+            chunk.append((number, expert, slots))
+            if len(chunk) >= chunk_size:
+                run.flush(chunk)
+                chunk = []
+        run.flush(chunk)
+    except Exception:
+        db.rollback()
+        raise
+
+    if dry_run or run.errors_total:
+        db.rollback()
+        return run.result(committed=False)
+    with crud.slot_conflicts(db):
+        db.commit()
+    availability_cache.invalidate()
+    availability_hub.publish("experts_changed")
+    return run.result(committed=True)
+
+
+def import_file(db: Session, stream: BinaryIO, fmt: ImportFormat, dry_run: bool = False) -> schemas.ImportResult:
+    return import_records(db, read_records(stream, fmt), dry_run)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path, help="файл CSV, JSON или NDJSON")
+    parser.add_argument("--format", choices=("csv", "json", "ndjson"), help="по умолчанию — по расширению файла")
+    parser.add_argument("--dry-run", action="store_true", help="только проверить файл, ничего не сохранять")
+    args = parser.parse_args()
+
+    db = WriterSessionLocal()
+    try:
+        with args.path.open("rb") as stream:
+            result = import_file(db, stream, args.format or detect_format(args.path.name), args.dry_run)
+    except HTTPException as error:
+        # Пересечение, найденное базой уже при записи (параллельное изменение расписания)
+        print(error.detail, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for error in result.errors:
+        print(f"Строка {error.row}: {'; '.join(error.errors)}", file=sys.stderr)
+    if result.errors_truncated:
+        print(f"Показаны первые {len(result.errors)} строк с ошибками", file=sys.stderr)
+    status = "сохранено" if result.committed else "не сохранено"
+    print(f"Строк: {result.rows}, экспертов новых: {result.experts_created}, обновлено: {result.experts_updated}, "
+          f"слотов: {result.slots_created} — {status}")
+    if result.errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
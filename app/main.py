@@ -1,20 +1,69 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta
 from pathlib import Path
 
-from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request, status
+from fastapi import Body, Depends, FastAPI, File, Header, HTTPException, Query, Request, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
+from app.archive import archive_periodically
+from app.assets import AssetFiles, AssetManifest, asset_response
+from app.cache import Snapshot, availability_cache, etag_matches
+from app.cluster import is_primary_worker, start_channel, stop_channel, warn_without_primary
 from app.config import get_settings
-from app.database import Base, engine, get_db
+from app.database import (
+    AnySession,
+    async_engine,
+    async_writer_engine,
+    engine,
+    get_session,
+    get_write_session,
+    run_db,
+    use_writer,
+    writer_engine,
+)
+from app.events import availability_hub
+from app.importer import ImportFormat, detect_format, import_file
+from app.export import ExportFormat, export_response
+from app.metrics import MetricsMiddleware, instrument_queries, metrics_registry
+from app.migrate import check_schema
+from app.outbox import drain_periodically, outbox_stats
+from app.pool_stats import async_pool_stats, async_writer_pool_stats, sync_pool_stats, sync_writer_pool_stats
+from app.profiling import ProfilingMiddleware, instrument_profiling
+from app.serialization import compress_variants, dump_json, json_response, rows_to_dicts
 
 settings = get_settings()
-app = FastAPI(title="Consultation Booking Service", version="1.0.0")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await run_in_threadpool(check_schema, engine, settings.auto_migrate)
+    channel = start_channel()
+    # Фоновые задачи нужны в одном экземпляре на деплой
+    background: list[asyncio.Task] = []
+    if is_primary_worker():
+        if settings.archive_interval_hours > 0:
+            background.append(asyncio.create_task(archive_periodically(settings.archive_interval_hours * 3600)))
+        if settings.outbox_worker:
+            background.append(asyncio.create_task(drain_periodically(settings.outbox_poll_seconds)))
+    else:
+        enabled = {"архивация": settings.archive_interval_hours > 0, "доставка outbox": settings.outbox_worker}
+        warn_without_primary([name for name, on in enabled.items() if on])
+    yield
+    for task in background:
+        task.cancel()
+    stop_channel(channel)
+
+
+app = FastAPI(title="Consultation Booking Service", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,15 +72,66 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-
-Base.metadata.create_all(bind=engine)
+if settings.metrics_enabled:
+    instrument_queries(engine)
+    if use_writer:
+        instrument_queries(writer_engine)
+    if async_engine is not None:
+        instrument_queries(async_engine.sync_engine)
+        if use_writer:
+            instrument_queries(async_writer_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
+# Слушатели профилирования ничего не делают, пока для запроса не включён профиль
+for profiled_engine in {engine, writer_engine}:
+    instrument_profiling(profiled_engine)
+if async_engine is not None:
+    for profiled_engine in {async_engine, async_writer_engine}:
+        instrument_profiling(profiled_engine.sync_engine)
+app.add_middleware(ProfilingMiddleware)
 
 
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+AVAILABILITY_EXPERT_FIELDS = ("full_name", "expertise_area", "bio", "contact_info", "meeting_room")
+SSE_RETRY_MS = 3000
+SSE_HEARTBEAT_SECONDS = 15
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 500
+SCHEDULE_PAST_DAYS = 30
+SCHEDULE_FUTURE_DAYS = 365
 ADMIN_COOKIE_NAME = "admin_auth"
 EXPERT_COOKIE_NAME = "expert_auth"
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+asset_manifest = AssetManifest(STATIC_DIR).build()
+app.mount("/static", AssetFiles(asset_manifest, StaticFiles(directory=STATIC_DIR)), name="static")
+PUBLIC_PAGE_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+PRIVATE_PAGE_CACHE_CONTROL = "private, no-cache"
+
+
+def html_page(request: Request, name: str, cache_control: str = PUBLIC_PAGE_CACHE_CONTROL) -> Response:
+    return asset_response(request, asset_manifest.pages[name], cache_control)
+
+
+def page_query(
+    limit: int = Query(default=PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = Query(default=None),
+    expert_id: int | None = Query(default=None),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+) -> dict:
+    # Общие параметры списков с keyset-пагинацией; границы периода — в UTC, как start_at в базе
+    return {
+        "limit": limit,
+        "cursor": cursor,
+        "expert_id": expert_id,
+        "date_from": crud.naive_utc(date_from) if date_from else None,
+        "date_to": crud.naive_utc(date_to) if date_to else None,
+    }
+
+
+async def page_response(request: Request, db: AnySession, fetch, page: dict, **filters) -> Response:
+    # fetch — функция crud с keyset-пагинацией (crud.keyset_page), возвращает (строки, next_cursor)
+    rows, next_cursor = await run_db(db, fetch, **page, **filters)
+    return json_response(request, dump_json({"items": rows_to_dicts(rows), "next_cursor": next_cursor}))
 
 
 def require_admin(x_admin_token: str | None = Header(default=None)):
@@ -39,6 +139,13 @@ def require_admin(x_admin_token: str | None = Header(default=None)):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Неверный токен администратора")
 
 
+def require_expert_or_admin(request: Request, x_admin_token: str | None = Header(default=None)):
+    # Страница эксперта ходит с cookie после входа, админские скрипты — с токеном
+    if request.cookies.get(EXPERT_COOKIE_NAME) == settings.expert_token or x_admin_token == settings.admin_token:
+        return
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Нужен вход эксперта")
+
+
 def serialize_slot(slot: models.Slot) -> schemas.SlotRead:
     return schemas.SlotRead(
         id=slot.id,
@@ -49,40 +156,28 @@ def serialize_slot(slot: models.Slot) -> schemas.SlotRead:
     )
 
 
-def serialize_expert(
-    expert: models.Expert,
-    min_date: datetime | None = None,
-    max_date: datetime | None = None,
-) -> schemas.ExpertWithSlots:
-    slots = sorted(expert.slots, key=lambda s: s.start_at)
-    if min_date:
-        slots = [slot for slot in slots if slot.start_at >= min_date]
-    if max_date:
-        slots = [slot for slot in slots if slot.start_at <= max_date]
-    return schemas.ExpertWithSlots(
-        id=expert.id,
-        full_name=expert.full_name,
-        expertise_area=expert.expertise_area,
-        bio=expert.bio,
-        contact_info=expert.contact_info,
-        meeting_room=expert.meeting_room,
-        slots=[serialize_slot(slot) for slot in slots],
-    )
+def event_matches_expert(message: dict, expert_id: int) -> bool:
+    # События booked/deleted несут только id слотов — их получают все подписчики
+    if "slots" in message:
+        return any(slot["expert_id"] == expert_id for slot in message["slots"])
+    if "expert_id" in message:
+        return message["expert_id"] == expert_id
+    return True
 
 
-@app.get("/", response_class=FileResponse)
-async def landing_page():
-    return FileResponse(STATIC_DIR / "index.html")
+@app.get("/", response_class=HTMLResponse)
+async def landing_page(request: Request):
+    return html_page(request, "index.html")
 
 
-@app.get("/student", response_class=FileResponse)
-async def student_page():
-    return FileResponse(STATIC_DIR / "student.html")
+@app.get("/student", response_class=HTMLResponse)
+async def student_page(request: Request):
+    return html_page(request, "student.html")
 
 
-@app.get("/expert/login", response_class=FileResponse)
-async def expert_login_page():
-    return FileResponse(STATIC_DIR / "expert-login.html")
+@app.get("/expert/login", response_class=HTMLResponse)
+async def expert_login_page(request: Request):
+    return html_page(request, "expert-login.html")
 
 
 @app.post("/expert/login")
@@ -113,12 +208,12 @@ async def expert_logout():
 async def expert_page(request: Request):
     if request.cookies.get(EXPERT_COOKIE_NAME) != settings.expert_token:
         return RedirectResponse(url="/expert/login", status_code=status.HTTP_303_SEE_OTHER)
-    return FileResponse(STATIC_DIR / "expert.html")
+    return html_page(request, "expert.html", PRIVATE_PAGE_CACHE_CONTROL)
 
 
-@app.get("/admin/login", response_class=FileResponse)
-async def admin_login_page():
-    return FileResponse(STATIC_DIR / "admin-login.html")
+@app.get("/admin/login", response_class=HTMLResponse)
+async def admin_login_page(request: Request):
+    return html_page(request, "admin-login.html")
 
 
 @app.post("/admin/login")
@@ -149,7 +244,7 @@ async def admin_logout():
 async def admin_page(request: Request):
     if request.cookies.get(ADMIN_COOKIE_NAME) != settings.admin_token:
         return RedirectResponse(url="/admin/login", status_code=status.HTTP_303_SEE_OTHER)
-    return FileResponse(STATIC_DIR / "admin.html")
+    return html_page(request, "admin.html", PRIVATE_PAGE_CACHE_CONTROL)
 
 
 @app.get("/health")
@@ -157,96 +252,392 @@ async def health_check():
     return {"status": "ok", "timestamp": datetime.utcnow()}
 
 
+def build_experts_snapshot(db: Session, horizon_days: int | None, include_slots: bool = True) -> Snapshot:
+    version = availability_cache.version
+    if include_slots:
+        min_date = datetime.utcnow() if horizon_days is not None else None
+        max_date = datetime.utcnow() + timedelta(days=horizon_days) if horizon_days is not None else None
+        experts = crud.get_experts_with_slots(db, min_date=min_date, max_date=max_date)
+    else:
+        # Только список экспертов (например, для выпадающего списка) — без запроса слотов
+        experts = [(expert, []) for expert in crud.get_all_experts(db)]
+    body = dump_json([{**expert._mapping, "slots": rows_to_dicts(slots)} for expert, slots in experts])
+    return availability_cache.put(("experts", horizon_days, include_slots), version, body, compress_variants(body))
+
+
+def build_availability_snapshot(
+    db: Session,
+    key: tuple,
+    fields: list[str],
+    expert_id: int | None,
+    date_from: datetime,
+    date_to: datetime | None,
+) -> Snapshot:
+    version = availability_cache.version
+    base = date_from.replace(second=0, microsecond=0)
+    experts = crud.get_free_slots_by_expert(db, fields, date_from, date_to, expert_id)
+    payload = {
+        "base": base,
+        "experts": [
+            {
+                **expert._mapping,
+                "slot_ids": [slot.id for slot in slots],
+                "offsets": [int((slot.start_at - base).total_seconds() // 60) for slot in slots],
+                "durations": [slot.duration_minutes for slot in slots],
+            }
+            for expert, slots in experts
+        ],
+    }
+    body = dump_json(payload)
+    return availability_cache.put(key, version, body, compress_variants(body))
+
+
+@app.get("/availability", response_model=schemas.AvailabilityResponse, response_model_exclude_unset=True)
+async def availability(
+    request: Request,
+    fields: str = Query(default="full_name,expertise_area"),
+    expert_id: int | None = Query(default=None),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    horizon_days: int | None = Query(default=None, ge=1, le=365),
+    if_none_match: str | None = Header(default=None),
+    db: AnySession = Depends(get_session),
+):
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = set(requested) - set(AVAILABILITY_EXPERT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(sorted(unknown))}")
+
+    # Прошедшие слоты не отдаются никогда; минуты округляем, чтобы ключ кэша не менялся каждый запрос
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    date_from = max(crud.naive_utc(date_from), now) if date_from else now
+    date_to = crud.naive_utc(date_to) if date_to else None
+    if horizon_days is not None:
+        horizon_end = now + timedelta(days=horizon_days)
+        date_to = min(date_to, horizon_end) if date_to else horizon_end
+
+    key = ("availability", tuple(requested), expert_id, date_from, date_to)
+    snapshot = availability_cache.get(key)
+    if snapshot is None:
+        snapshot = await run_db(db, build_availability_snapshot, key, requested, expert_id, date_from, date_to)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return json_response(request, snapshot.body, snapshot.encodings, headers)
+
+
+@app.get("/slots/search", response_model=list[schemas.SlotSearchResult])
+async def search_slots(
+    request: Request,
+    q: str | None = Query(default=None, max_length=100),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    min_duration: int | None = Query(default=None, ge=1, le=240),
+    weekdays: list[int] | None = Query(default=None),
+    time_from: time | None = Query(default=None),
+    time_to: time | None = Query(default=None),
+    limit: int = Query(default=10, ge=1, le=100),
+    db: AnySession = Depends(get_session),
+):
+    if weekdays and any(day < 0 or day > 6 for day in weekdays):
+        raise HTTPException(status_code=400, detail="Дни недели задаются числами от 0 (пн) до 6 (вс)")
+    if time_from and time_to and time_to <= time_from:
+        raise HTTPException(status_code=400, detail="Конец окна должен быть позже начала")
+
+    now = datetime.utcnow()
+    rows = await run_db(
+        db,
+        crud.search_free_slots,
+        limit=limit,
+        date_from=max(crud.naive_utc(date_from), now) if date_from else now,
+        date_to=crud.naive_utc(date_to) if date_to else None,
+        query=q,
+        min_duration=min_duration,
+        weekdays=weekdays,
+        time_from=time_from,
+        time_to=time_to,
+    )
+    return json_response(request, dump_json(rows_to_dicts(rows)))
+
+
+@app.get("/events/availability")
+async def availability_events(request: Request, expert_id: int | None = Query(default=None)):
+    subscriber = availability_hub.subscribe()
+
+    async def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    message = {"id": message["id"], "type": "resync"}
+                if expert_id is not None and not event_matches_expert(message, expert_id):
+                    continue
+                yield f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+        finally:
+            availability_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Метрики отключены")
+    pools = {"sync": sync_pool_stats}
+    if use_writer:
+        pools["sync_writer"] = sync_writer_pool_stats
+    if async_engine is not None:
+        pools["async"] = async_pool_stats
+        if use_writer:
+            pools["async_writer"] = async_writer_pool_stats
+    return Response(
+        content=metrics_registry.render(pools),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.get("/admin/db-pool", dependencies=[Depends(require_admin)])
+async def db_pool_stats():
+    if settings.db_mode == "async":
+        stats, writer_stats = async_pool_stats, async_writer_pool_stats
+    else:
+        stats, writer_stats = sync_pool_stats, sync_writer_pool_stats
+    result = {"mode": settings.db_mode, **stats.snapshot()}
+    if use_writer:
+        result["writer"] = writer_stats.snapshot()
+    return result
+
+
+@app.get("/admin/outbox", dependencies=[Depends(require_admin)])
+async def outbox_status(db: AnySession = Depends(get_session)):
+    return await run_db(db, outbox_stats)
+
+
 @app.get("/experts", response_model=list[schemas.ExpertWithSlots])
-def list_experts(
+async def list_experts(
+    request: Request,
     horizon_days: int | None = Query(default=None, ge=1, le=365),
-    db: Session = Depends(get_db),
+    include_slots: bool = Query(default=True),
+    if_none_match: str | None = Header(default=None),
+    db: AnySession = Depends(get_session),
 ):
-    experts = crud.get_all_experts(db)
-    min_date = datetime.utcnow() if horizon_days is not None else None
-    max_date = datetime.utcnow() + timedelta(days=horizon_days) if horizon_days is not None else None
-    return [serialize_expert(expert, min_date=min_date, max_date=max_date) for expert in experts]
+    snapshot = availability_cache.get(("experts", horizon_days, include_slots))
+    if snapshot is None:
+        snapshot = await run_db(db, build_experts_snapshot, horizon_days, include_slots)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return json_response(request, snapshot.body, snapshot.encodings, headers)
 
 
 @app.post("/experts", response_model=schemas.ExpertRead, dependencies=[Depends(require_admin)])
-def create_expert(payload: schemas.ExpertCreate, db: Session = Depends(get_db)):
-    expert = crud.create_expert(db, payload)
+async def create_expert(payload: schemas.ExpertCreate, db: AnySession = Depends(get_write_session)):
+    expert = await run_db(db, crud.create_expert, payload)
     return schemas.ExpertRead.model_validate(expert)
 
 
 @app.patch("/experts/{expert_id}", response_model=schemas.ExpertRead, dependencies=[Depends(require_admin)])
-def update_expert(expert_id: int, payload: schemas.ExpertUpdate, db: Session = Depends(get_db)):
-    expert = crud.update_expert(db, expert_id, payload)
+async def update_expert(expert_id: int, payload: schemas.ExpertUpdate, db: AnySession = Depends(get_write_session)):
+    expert = await run_db(db, crud.update_expert, expert_id, payload)
     return schemas.ExpertRead.model_validate(expert)
 
 
 @app.delete("/experts/{expert_id}", dependencies=[Depends(require_admin)])
-def delete_expert(expert_id: int, db: Session = Depends(get_db)):
-    crud.delete_expert(db, expert_id)
+async def delete_expert(expert_id: int, db: AnySession = Depends(get_write_session)):
+    await run_db(db, crud.delete_expert, expert_id)
     return {"message": "Эксперт удалён"}
 
 
-@app.get("/slots", response_model=list[schemas.SlotRead])
-def list_slots(db: Session = Depends(get_db)):
-    slots = crud.get_slots(db)
-    return [serialize_slot(slot) for slot in slots]
+@app.get("/slots", response_model=schemas.SlotPage)
+async def list_slots(
+    request: Request,
+    page: dict = Depends(page_query),
+    is_available: bool | None = Query(default=None),
+    db: AnySession = Depends(get_session),
+):
+    return await page_response(request, db, crud.get_slots, page, is_available=is_available)
 
 
 @app.post("/slots", response_model=schemas.SlotRead, dependencies=[Depends(require_admin)])
-def create_slot(payload: schemas.SlotCreate, db: Session = Depends(get_db)):
-    slot = crud.create_slot(db, payload)
-    return serialize_slot(slot)
+async def create_slot(payload: schemas.SlotCreate, db: AnySession = Depends(get_write_session)):
+    # serialize_slot читает slot.booking, поэтому сериализуем внутри той же синхронной функции
+    return await run_db(db, lambda session: serialize_slot(crud.create_slot(session, payload)))
 
 
-@app.post("/slots/batch", response_model=list[schemas.SlotRead], dependencies=[Depends(require_admin)])
-def create_slot_batch(payload: schemas.SlotBatchCreate, db: Session = Depends(get_db)):
-    slots = crud.create_slots_batch(db, payload)
-    return [serialize_slot(slot) for slot in slots]
+@app.post("/slots/batch", response_model=schemas.SlotBatchResult, dependencies=[Depends(require_admin)])
+async def create_slot_batch(payload: schemas.SlotBatchCreate, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, crud.create_slots_batch, payload)
 
 
 @app.patch("/slots/{slot_id}", response_model=schemas.SlotRead, dependencies=[Depends(require_admin)])
-def update_slot(slot_id: int, payload: schemas.SlotUpdate, db: Session = Depends(get_db)):
-    slot = crud.update_slot(db, slot_id, payload)
-    return serialize_slot(slot)
+async def update_slot(slot_id: int, payload: schemas.SlotUpdate, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, lambda session: serialize_slot(crud.update_slot(session, slot_id, payload)))
 
 
 @app.delete("/slots/{slot_id}", dependencies=[Depends(require_admin)])
-def delete_slot(slot_id: int, db: Session = Depends(get_db)):
-    crud.delete_slot(db, slot_id)
+async def delete_slot(slot_id: int, db: AnySession = Depends(get_write_session)):
+    await run_db(db, crud.delete_slot, slot_id)
     return {"message": "Слот удалён"}
 
 
 @app.post("/slots/{slot_id}/book", response_model=schemas.BookingRead)
-def book_slot(slot_id: int, payload: schemas.BookingCreate, db: Session = Depends(get_db)):
-    booking = crud.book_slot(db, slot_id, payload)
+async def book_slot(slot_id: int, payload: schemas.BookingCreate, db: AnySession = Depends(get_write_session)):
+    booking = await run_db(db, crud.book_slot, slot_id, payload)
     return schemas.BookingRead.model_validate(booking)
 
 
 @app.delete("/bookings/{booking_id}")
-def delete_booking_student(booking_id: int, cancellation_code: str, db: Session = Depends(get_db)):
-    crud.delete_booking_as_student(db, booking_id, cancellation_code)
+async def delete_booking_student(booking_id: int, cancellation_code: str, db: AnySession = Depends(get_write_session)):
+    await run_db(db, crud.delete_booking_as_student, booking_id, cancellation_code)
     return {"message": "Запись отменена"}
 
 
-@app.get("/bookings", response_model=list[schemas.BookingRead], dependencies=[Depends(require_admin)])
-def admin_list_bookings(db: Session = Depends(get_db)):
-    bookings = crud.list_bookings(db)
-    return [schemas.BookingRead.model_validate(b) for b in bookings]
+@app.get("/bookings", response_model=schemas.BookingPage, dependencies=[Depends(require_admin)])
+async def admin_list_bookings(
+    request: Request,
+    page: dict = Depends(page_query),
+    db: AnySession = Depends(get_session),
+):
+    return await page_response(request, db, crud.list_bookings, page)
+
+
+@app.get("/admin/archive/slots", response_model=schemas.ArchivedSlotPage, dependencies=[Depends(require_admin)])
+async def admin_archived_slots(
+    request: Request,
+    page: dict = Depends(page_query),
+    db: AnySession = Depends(get_session),
+):
+    return await page_response(request, db, crud.list_archived_slots, page)
+
+
+@app.get("/admin/archive/bookings", response_model=schemas.ArchivedBookingPage, dependencies=[Depends(require_admin)])
+async def admin_archived_bookings(
+    request: Request,
+    page: dict = Depends(page_query),
+    db: AnySession = Depends(get_session),
+):
+    return await page_response(request, db, crud.list_archived_bookings, page)
+
+
+@app.get("/admin/export/bookings", dependencies=[Depends(require_admin)])
+async def export_bookings(
+    fmt: ExportFormat = Query(default="csv", alias="format"),
+    expert_id: int | None = Query(default=None),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+):
+    stmt = crud.export_bookings_query(
+        expert_id,
+        crud.naive_utc(date_from) if date_from else None,
+        crud.naive_utc(date_to) if date_to else None,
+    )
+    return export_response(stmt, fmt, "bookings")
+
+
+@app.get("/admin/export/slots", dependencies=[Depends(require_admin)])
+async def export_slots(
+    fmt: ExportFormat = Query(default="csv", alias="format"),
+    expert_id: int | None = Query(default=None),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+):
+    stmt = crud.export_slots_query(
+        expert_id,
+        crud.naive_utc(date_from) if date_from else None,
+        crud.naive_utc(date_to) if date_to else None,
+    )
+    return export_response(stmt, fmt, "slots")
+
+
+@app.post("/admin/import", response_model=schemas.ImportResult, dependencies=[Depends(require_admin)])
+async def import_experts(
+    file: UploadFile = File(...),
+    fmt: ImportFormat | None = Query(default=None, alias="format"),
+    dry_run: bool = Query(default=False),
+    db: AnySession = Depends(get_write_session),
+):
+    result = await run_db(db, import_file, file.file, fmt or detect_format(file.filename), dry_run)
+    # Ошибки в строках — 422 с полным отчётом; ничего не сохранено
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY if result.errors else status.HTTP_200_OK
+    return JSONResponse(result.model_dump(mode="json"), status_code=status_code)
+
+
+@app.post("/admin/slots/bulk-delete", response_model=schemas.BulkResult, dependencies=[Depends(require_admin)])
+async def bulk_delete_slots(payload: schemas.SlotBulkDelete, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, crud.bulk_delete_slots, payload)
+
+
+@app.post("/admin/slots/bulk-shift", response_model=schemas.BulkResult, dependencies=[Depends(require_admin)])
+async def bulk_shift_slots(payload: schemas.SlotBulkShift, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, crud.bulk_shift_slots, payload)
+
+
+@app.post("/admin/slots/bulk-reassign", response_model=schemas.BulkResult, dependencies=[Depends(require_admin)])
+async def bulk_reassign_slots(payload: schemas.SlotBulkReassign, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, crud.bulk_reassign_slots, payload)
+
+
+@app.post("/admin/bookings/bulk-delete", response_model=schemas.BulkResult, dependencies=[Depends(require_admin)])
+async def bulk_delete_bookings(payload: schemas.BookingBulkDelete, db: AnySession = Depends(get_write_session)):
+    return await run_db(db, crud.bulk_delete_bookings, payload)
 
 
 @app.delete("/admin/bookings/{booking_id}", dependencies=[Depends(require_admin)])
-def delete_booking_admin(booking_id: int, db: Session = Depends(get_db)):
-    crud.delete_booking_as_admin(db, booking_id)
+async def delete_booking_admin(booking_id: int, db: AnySession = Depends(get_write_session)):
+    await run_db(db, crud.delete_booking_as_admin, booking_id)
     return {"message": "Запись удалена"}
 
 
 @app.patch("/admin/bookings/{booking_id}", response_model=schemas.BookingRead, dependencies=[Depends(require_admin)])
-def admin_update_booking(booking_id: int, payload: schemas.BookingAdminUpdate, db: Session = Depends(get_db)):
-    booking = crud.update_booking_admin(db, booking_id, payload)
+async def admin_update_booking(booking_id: int, payload: schemas.BookingAdminUpdate, db: AnySession = Depends(get_write_session)):
+    booking = await run_db(db, crud.update_booking_admin, booking_id, payload)
     return schemas.BookingRead.model_validate(booking)
 
 
+def serialize_schedule(slots: list) -> list[dict]:
+    result = []
+    for row in slots:
+        data = row._asdict()
+        booking = {key.removeprefix("booking_"): data.pop(key) for key in list(data) if key.startswith("booking_")}
+        data["booking"] = booking if booking["id"] is not None else None
+        result.append(data)
+    return result
+
+
+@app.get(
+    "/experts/{expert_id}/schedule",
+    response_model=schemas.ExpertSchedule,
+    dependencies=[Depends(require_expert_or_admin)],
+)
+async def expert_schedule(
+    request: Request,
+    expert_id: int,
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    db: AnySession = Depends(get_session),
+):
+    # По умолчанию — прошедший месяц и год вперёд
+    now = datetime.utcnow().replace(microsecond=0)
+    date_from = crud.naive_utc(date_from) if date_from else now - timedelta(days=SCHEDULE_PAST_DAYS)
+    date_to = crud.naive_utc(date_to) if date_to else now + timedelta(days=SCHEDULE_FUTURE_DAYS)
+    expert, slots = await run_db(db, crud.get_expert_schedule, expert_id, date_from, date_to)
+    payload = {**expert._mapping, "date_from": date_from, "date_to": date_to, "slots": serialize_schedule(slots)}
+    return json_response(request, dump_json(payload))
+
+
 @app.get("/experts/{expert_id}/bookings", response_model=list[schemas.BookingRead])
-def expert_bookings(expert_id: int, db: Session = Depends(get_db)):
-    bookings = crud.list_bookings_by_expert(db, expert_id)
-    return [schemas.BookingRead.model_validate(b) for b in bookings]
+async def expert_bookings(request: Request, expert_id: int, db: AnySession = Depends(get_session)):
+    bookings = await run_db(db, crud.list_bookings_by_expert, expert_id)
+    return json_response(request, dump_json(rows_to_dicts(bookings)))
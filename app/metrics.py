@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.pool_stats import WAIT_BUCKETS, PoolStats
+
+INF = float("inf")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, INF)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, INF)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+class RequestDbStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Счётчики SQL текущего запроса; threadpool и AsyncSession.run_sync наследуют контекст
+current_db_stats: ContextVar[RequestDbStats | None] = ContextVar("current_db_stats", default=None)
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == INF else repr(float(bound))
+
+
+def _labels(**labels: Any) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(name: str, labels: dict[str, Any], histogram: Histogram | None = None, *,
+                     bounds: Iterable[float] = (), counts: Iterable[int] = (),
+                     total: float = 0.0, count: int = 0) -> list[str]:
+    if histogram is not None:
+        bounds, counts, total, count = histogram.bounds, histogram.counts, histogram.total, histogram.count
+    lines = []
+    cumulative = 0
+    for bound, bucket in zip(bounds, counts):
+        cumulative += bucket
+        lines.append(f"{name}_bucket{_labels(**labels, le=_format_bound(bound))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+
+class MetricsRegistry:
+    """Метрики HTTP и SQL в памяти процесса, отдаются в текстовом формате Prometheus."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.db_statements: dict[tuple[str, str], int] = {}
+        self.db_seconds: dict[tuple[str, str], float] = {}
+        self.db_per_request: dict[tuple[str, str], Histogram] = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, db: RequestDbStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            latency.observe(duration)
+            self.db_statements[key] = self.db_statements.get(key, 0) + db.statements
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + db.seconds
+            per_request = self.db_per_request.get(key)
+            if per_request is None:
+                per_request = self.db_per_request[key] = Histogram(QUERY_COUNT_BUCKETS)
+            per_request.observe(db.statements)
+
+    def render(self, pools: dict[str, PoolStats] | None = None) -> str:
+        lines: list[str] = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Total HTTP requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+
+            lines += [
+                "# HELP http_request_duration_seconds HTTP request latency.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.latency.items()):
+                lines += _histogram_lines("http_request_duration_seconds", {"method": method, "route": route}, histogram)
+
+            lines += [
+                "# HELP db_statements_total SQL statements executed while serving requests.",
+                "# TYPE db_statements_total counter",
+            ]
+            for (method, route), value in sorted(self.db_statements.items()):
+                lines.append(f"db_statements_total{_labels(method=method, route=route)} {value}")
+
+            lines += [
+                "# HELP db_time_seconds_total Time spent in SQL statements while serving requests.",
+                "# TYPE db_time_seconds_total counter",
+            ]
+            for (method, route), value in sorted(self.db_seconds.items()):
+                lines.append(f"db_time_seconds_total{_labels(method=method, route=route)} {value}")
+
+            lines += [
+                "# HELP db_statements_per_request SQL statements per HTTP request.",
+                "# TYPE db_statements_per_request histogram",
+            ]
+            for (method, route), histogram in sorted(self.db_per_request.items()):
+                lines += _histogram_lines("db_statements_per_request", {"method": method, "route": route}, histogram)
+
+        for pool_name, stats in (pools or {}).items():
+            lines += _pool_lines(pool_name, stats.snapshot())
+        return "\n".join(lines) + "\n"
+
+
+def _pool_lines(pool_name: str, snapshot: dict[str, Any]) -> list[str]:
+    labels = {"pool": pool_name}
+    lines = []
+    for metric, key, kind in (
+        ("db_pool_size", "pool_size", "gauge"),
+        ("db_pool_max_overflow", "max_overflow", "gauge"),
+        ("db_pool_checked_out", "checked_out", "gauge"),
+        ("db_pool_max_checked_out", "max_checked_out", "gauge"),
+        ("db_pool_checkouts_total", "checkouts", "counter"),
+        ("db_pool_overflow_checkouts_total", "overflow_checkouts", "counter"),
+        ("db_pool_connects_total", "connects", "counter"),
+        ("db_pool_invalidations_total", "invalidations", "counter"),
+        ("db_pool_timeouts_total", "timeouts", "counter"),
+    ):
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f"{metric}{_labels(**labels)} {snapshot[key]}")
+    lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+    lines += _histogram_lines(
+        "db_pool_checkout_wait_seconds",
+        labels,
+        bounds=WAIT_BUCKETS,
+        counts=snapshot["wait_buckets"].values(),
+        total=snapshot["wait_seconds_total"],
+        count=sum(snapshot["wait_buckets"].values()),
+    )
+    return lines
+
+
+def instrument_queries(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_db_stats.get() is not None:
+            conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_db_stats.get()
+        if stats is None:
+            return
+        started = conn.info.get("query_started_at")
+        stats.statements += 1
+        if started:
+            stats.seconds += time.perf_counter() - started.pop()
+
+
+def route_label(scope: dict) -> str:
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    if scope.get("path", "").startswith("/static/"):
+        return "/static"
+    # Неизвестные пути не попадают в метки, иначе число рядов растёт неограниченно
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db_stats = RequestDbStats()
+        token = current_db_stats.set(db_stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_db_stats.reset(token)
+            self.registry.observe(
+                scope["method"],
+                route_label(scope),
+                status_code,
+                time.perf_counter() - started,
+                db_stats,
+            )
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,184 @@
+"""Создание и обновление схемы базы. Запускается один раз на деплой:
+
+    python -m app.migrate            # создать недостающие таблицы, колонки и индексы
+    python -m app.migrate --check    # только проверить, что схема актуальна (код выхода 1, если нет)
+
+Приложение при старте DDL не выполняет, а лишь сверяет отпечаток схемы
+(см. ``check_schema``) — одним запросом к таблице ``schema_version``.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import sys
+
+from sqlalchemy import Column, Engine, Integer, MetaData, String, Table, bindparam, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from app import models
+from app.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+# Служебная таблица живёт в отдельных метаданных, чтобы не попадать в отпечаток моделей
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+)
+
+
+def schema_fingerprint() -> str:
+    # Меняется при добавлении таблиц, колонок и индексов в моделях — тогда старт
+    # приложения требует повторного запуска миграции
+    parts = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        parts.append(table.name)
+        parts.extend(f"{table.name}.{column.name}" for column in table.columns)
+        parts.extend(f"{table.name}#{index.name}" for index in sorted(table.indexes, key=lambda i: i.name))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def stored_fingerprint(bind: Engine) -> str | None:
+    try:
+        with bind.connect() as conn:
+            return conn.scalar(select(schema_version.c.fingerprint).where(schema_version.c.id == 1))
+    except DBAPIError:
+        # Таблицы ещё нет — база не мигрирована
+        return None
+
+
+def backfill_expert_search_text(conn) -> None:
+    experts = models.Expert.__table__
+    rows = conn.execute(select(experts.c.id, experts.c.full_name, experts.c.expertise_area)).all()
+    if rows:
+        conn.execute(
+            experts.update().where(experts.c.id == bindparam("expert_id")),
+            [
+                {"expert_id": row.id, "search_text": models.expert_search_text(row.full_name, row.expertise_area)}
+                for row in rows
+            ],
+        )
+
+
+# Заполнение колонок, добавленных в существующие таблицы
+BACKFILLS = {
+    ("experts", "search_text"): backfill_expert_search_text,
+}
+
+
+# Ограничения только для PostgreSQL: пересечение слотов одного эксперта запрещено
+# на уровне базы (btree_gist нужен для expert_id WITH = в GiST-индексе). Ограничение
+# отложенное: проверяется при commit, а не посреди executemany или COPY
+POSTGRES_CONSTRAINTS = {
+    "ex_slots_expert_overlap": (
+        "slots",
+        "EXCLUDE USING gist "
+        "(expert_id WITH =, tsrange(start_at, start_at + duration_minutes * interval '1 minute') WITH &&) "
+        "DEFERRABLE INITIALLY DEFERRED",
+    ),
+}
+
+
+def add_postgres_constraints(bind: Engine) -> list[str]:
+    applied: list[str] = []
+    with bind.connect() as conn:
+        existing = set(conn.scalars(text("SELECT conname FROM pg_constraint")))
+    for name, (table, definition) in POSTGRES_CONSTRAINTS.items():
+        if name in existing:
+            continue
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+        except DBAPIError as error:
+            # Скорее всего, в базе уже есть пересекающиеся слоты: их нужно развести и повторить миграцию
+            logger.warning("Не удалось добавить ограничение %s: %s", name, error.orig)
+            continue
+        applied.append(f"ADD CONSTRAINT {name}")
+    return applied
+
+
+def migrate(bind: Engine = engine) -> list[str]:
+    """Приводит схему к моделям и возвращает список выполненных изменений.
+
+    Новые таблицы создаются целиком; в существующие добавляются недостающие
+    колонки (как NULL-able; старые строки заполняет функция из ``BACKFILLS``,
+    если она есть) и индексы. На PostgreSQL — ещё ограничения из ``POSTGRES_CONSTRAINTS``.
+    Удаление и изменение колонок не выполняется.
+    """
+    applied: list[str] = []
+    if bind.dialect.name == "postgresql":
+        # Нужно для триграммного индекса поиска по экспертам
+        with bind.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+
+    existing_tables = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            table.create(bind)
+            applied.append(f"CREATE TABLE {table.name}")
+
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                applied.append(f"ADD COLUMN {table.name}.{column.name}")
+                backfill = BACKFILLS.get((table.name, column.name))
+                if backfill is not None:
+                    backfill(conn)
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    applied.append(f"CREATE INDEX {index.name}")
+
+    if bind.dialect.name == "postgresql":
+        applied += add_postgres_constraints(bind)
+
+    version_metadata.create_all(bind)
+    with bind.begin() as conn:
+        conn.execute(schema_version.delete())
+        conn.execute(schema_version.insert().values(id=1, fingerprint=schema_fingerprint()))
+    return applied
+
+
+def check_schema(bind: Engine = engine, auto_migrate: bool = False) -> None:
+    # Вызывается из lifespan: в обычном случае это один SELECT без интроспекции
+    if stored_fingerprint(bind) == schema_fingerprint():
+        return
+    if not auto_migrate:
+        raise RuntimeError("Схема базы устарела или не создана — выполните `python -m app.migrate`")
+    for change in migrate(bind):
+        logger.info("Миграция: %s", change)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="только проверить актуальность схемы")
+    args = parser.parse_args()
+
+    if args.check:
+        if stored_fingerprint(engine) != schema_fingerprint():
+            print("Схема устарела — нужна миграция")
+            sys.exit(1)
+        print("Схема актуальна")
+        return
+
+    applied = migrate(engine)
+    for change in applied:
+        print(change)
+    print(f"Готово, изменений: {len(applied)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,35 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.database import Base
 
 
+def expert_search_text(full_name: str | None, expertise_area: str | None) -> str:
+    # SQLite lower()/LIKE не понимают кириллицу, поэтому строку для поиска нормализуем в Python
+    return f"{full_name or ''} {expertise_area or ''}".casefold()
+
+
+def default_search_text(context) -> str:
+    params = context.get_current_parameters()
+    return expert_search_text(params.get("full_name"), params.get("expertise_area"))
+
+
 class Expert(Base):
     __tablename__ = "experts"
+    # В PostgreSQL — триграммный GIN для LIKE '%...%'; в SQLite превращается в обычный индекс
+    __table_args__ = (
+        Index(
+            "ix_experts_search_text",
+            "search_text",
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+        # Естественный ключ эксперта при импорте (app.importer)
+        Index("ix_experts_full_name", "full_name"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     full_name: Mapped[str] = mapped_column(String(120), nullable=False)
@@ -18,16 +39,24 @@ class Expert(Base):
     bio: Mapped[str | None] = mapped_column(Text, default=None)
     contact_info: Mapped[str | None] = mapped_column(String(200), default=None)
     meeting_room: Mapped[str | None] = mapped_column(String(500), default=None)
+    search_text: Mapped[str] = mapped_column(String(330), nullable=False, default=default_search_text)
 
     slots: Mapped[List[Slot]] = relationship("Slot", back_populates="expert", cascade="all, delete-orphan")
 
+    @validates("full_name", "expertise_area")
+    def _refresh_search_text(self, key: str, value: str) -> str:
+        fields = {"full_name": self.full_name, "expertise_area": self.expertise_area, key: value}
+        self.search_text = expert_search_text(fields["full_name"], fields["expertise_area"])
+        return value
+
 
 class Slot(Base):
     __tablename__ = "slots"
+    __table_args__ = (Index("ix_slots_expert_start", "expert_id", "start_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     expert_id: Mapped[int] = mapped_column(ForeignKey("experts.id", ondelete="CASCADE"), nullable=False)
-    start_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    start_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
     duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=30)
 
     expert: Mapped[Expert] = relationship("Expert", back_populates="slots")
@@ -47,6 +76,58 @@ class Booking(Base):
     magistracy: Mapped[str | None] = mapped_column(String(200), default=None)
     artifacts_link: Mapped[str | None] = mapped_column(String(500), default=None)
     cancellation_code: Mapped[str] = mapped_column(String(12), nullable=False, index=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     slot: Mapped[Slot] = relationship("Slot", back_populates="booking")
+
+
+# Архив прошедших консультаций: строки переносятся сюда из slots/bookings фоновой задачей.
+# Внешних ключей нет — архив переживает удаление эксперта. У архива свои id: SQLite
+# выдаёт id удалённых строк заново, поэтому исходный id (original_id) может повторяться.
+class ArchivedSlot(Base):
+    __tablename__ = "archived_slots"
+    __table_args__ = (Index("ix_archived_slots_expert_start", "expert_id", "start_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    original_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    expert_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    expert_name: Mapped[str] = mapped_column(String(120), nullable=False)
+    start_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArchivedBooking(Base):
+    __tablename__ = "archived_bookings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    original_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # slot_id — исходный id слота, archived_slot_id — его строка в archived_slots
+    slot_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    archived_slot_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    student_name: Mapped[str] = mapped_column(String(120), nullable=False)
+    student_email: Mapped[str] = mapped_column(String(200), nullable=False)
+    question: Mapped[str] = mapped_column(Text, nullable=False)
+    vkr_type: Mapped[str | None] = mapped_column(String(100), default=None)
+    magistracy: Mapped[str | None] = mapped_column(String(200), default=None)
+    artifacts_link: Mapped[str | None] = mapped_column(String(500), default=None)
+    cancellation_code: Mapped[str] = mapped_column(String(12), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Исходящие сообщения (подтверждения, уведомления), записанные в той же транзакции,
+# что и изменение записи. Доставляет их фоновый обработчик из app.outbox.
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (Index("ix_outbox_status_available", "status", "available_at"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, default=None)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at: Mapped[datetime | None] = mapped_column(DateTime, default=None)
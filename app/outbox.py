@@ -0,0 +1,354 @@
+"""Транзакционный outbox для побочных эффектов записи на консультацию.
+
+crud кладёт сообщение в таблицу ``outbox`` в той же транзакции, что и саму
+запись/отмену, и сразу отвечает клиенту. Доставкой занимается обработчик:
+фоновая задача приложения (OUTBOX_WORKER=true) или отдельный процесс
+
+    python -m app.outbox             # обрабатывать очередь, пока не остановят
+    python -m app.outbox --once      # один проход и выход
+
+Неудачные попытки повторяются с экспоненциальной задержкой; после
+OUTBOX_MAX_ATTEMPTS сообщение помечается ``failed``. Доставленные сообщения
+удаляются через OUTBOX_RETENTION_DAYS дней.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Row, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.config import get_settings
+from app.database import AsyncWriterSessionLocal, WriterSessionLocal
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+# На сколько взятая пачка скрывается от других обработчиков (с запасом на SMTP-таймауты)
+CLAIM_SECONDS = 1800
+# Доставленные сообщения старше OUTBOX_RETENTION_DAYS удаляются раз в час
+PURGE_INTERVAL_SECONDS = 3600
+PURGE_BATCH_SIZE = 1000
+
+
+def enqueue(db: Session, topic: str, payload: dict[str, Any]) -> None:
+    # Без commit: сообщение фиксируется вместе с транзакцией вызывающего кода
+    db.execute(insert(models.OutboxMessage).values(topic=topic, payload=json.dumps(payload, default=str)))
+
+
+def booking_payload(db: Session, booking: Any, slot_id: int | None = None) -> dict[str, Any]:
+    # Снимок данных на момент события: после отмены записи в базе уже не будет
+    slot = db.execute(
+        select(
+            models.Slot.start_at,
+            models.Slot.duration_minutes,
+            models.Expert.full_name,
+            models.Expert.meeting_room,
+        )
+        .join(models.Expert, models.Expert.id == models.Slot.expert_id)
+        .where(models.Slot.id == (slot_id or booking.slot_id))
+    ).first()
+    return {
+        "booking_id": booking.id,
+        "slot_id": slot_id or booking.slot_id,
+        "student_name": booking.student_name,
+        "student_email": booking.student_email,
+        "cancellation_code": booking.cancellation_code,
+        "start_at": slot.start_at.isoformat() if slot else None,
+        "duration_minutes": slot.duration_minutes if slot else None,
+        "expert_name": slot.full_name if slot else None,
+        "meeting_room": slot.meeting_room if slot else None,
+    }
+
+
+def enqueue_cancellations(db: Session, condition) -> None:
+    # Массовая отмена: данные всех затронутых записей одним запросом, сообщения — одним executemany
+    rows = db.execute(
+        select(
+            models.Booking.id.label("booking_id"),
+            models.Booking.slot_id,
+            models.Booking.student_name,
+            models.Booking.student_email,
+            models.Booking.cancellation_code,
+            models.Slot.start_at,
+            models.Slot.duration_minutes,
+            models.Expert.full_name.label("expert_name"),
+            models.Expert.meeting_room,
+        )
+        .join(models.Slot, models.Slot.id == models.Booking.slot_id)
+        .join(models.Expert, models.Expert.id == models.Slot.expert_id)
+        .where(condition)
+    ).all()
+    if rows:
+        db.execute(
+            insert(models.OutboxMessage),
+            [
+                {"topic": "booking.cancelled", "payload": json.dumps(row._asdict(), default=str)}
+                for row in rows
+            ],
+        )
+
+
+SUBJECTS = {
+    "booking.created": "Вы записаны на консультацию",
+    "booking.cancelled": "Запись на консультацию отменена",
+    "booking.moved": "Время консультации изменено",
+}
+
+
+def render_email(topic: str, payload: dict[str, Any], sender: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = payload["student_email"]
+    message["Subject"] = SUBJECTS.get(topic, topic)
+    lines = [
+        f"Здравствуйте, {payload['student_name']}!",
+        "",
+        f"{SUBJECTS.get(topic, topic)}.",
+        f"Эксперт: {payload.get('expert_name')}",
+        f"Время (UTC): {payload.get('start_at')}, {payload.get('duration_minutes')} мин",
+    ]
+    if topic != "booking.cancelled":
+        lines.append(f"ID записи: {payload['booking_id']}, код отмены: {payload['cancellation_code']}")
+        if payload.get("meeting_room"):
+            lines.append(f"Комната для встречи: {payload['meeting_room']}")
+    message.set_content("\n".join(lines))
+    return message
+
+
+class DeliveryBackend:
+    def send(self, topic: str, payload: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class LogBackend(DeliveryBackend):
+    def send(self, topic: str, payload: dict[str, Any]) -> None:
+        logger.info("outbox %s: %s", topic, payload)
+
+
+class FileBackend(DeliveryBackend):
+    """Дописывает сообщения в JSON Lines — заменитель почты для разработки и тестов."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def send(self, topic: str, payload: dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"topic": topic, "payload": payload, "sent_at": datetime.utcnow().isoformat()}
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class SmtpBackend(DeliveryBackend):
+    """Письмо студенту; для отладки подойдёт `python -m aiosmtpd -n -l localhost:1025`."""
+
+    def __init__(self, host: str, port: int, sender: str, timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.timeout = timeout
+
+    def send(self, topic: str, payload: dict[str, Any]) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as client:
+            client.send_message(render_email(topic, payload, self.sender))
+
+
+def make_backend() -> DeliveryBackend:
+    settings = get_settings()
+    if settings.outbox_backend == "file":
+        return FileBackend(settings.outbox_file)
+    if settings.outbox_backend == "smtp":
+        return SmtpBackend(settings.smtp_host, settings.smtp_port, settings.smtp_from)
+    return LogBackend()
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(db: Session, batch_size: int) -> list[Row]:
+    # Короткая транзакция: сообщения откладываются на CLAIM_SECONDS, чтобы их не взял
+    # другой обработчик; если процесс упадёт во время отправки, они вернутся в очередь
+    now = datetime.utcnow()
+    stmt = (
+        select(models.OutboxMessage.id, models.OutboxMessage.topic, models.OutboxMessage.payload,
+               models.OutboxMessage.attempts)
+        .where(models.OutboxMessage.status == "pending", models.OutboxMessage.available_at <= now)
+        .order_by(models.OutboxMessage.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Несколько обработчиков не возьмут одно и то же сообщение
+        stmt = stmt.with_for_update(skip_locked=True)
+    messages: list[Row] = db.execute(stmt).all()
+    if messages:
+        db.execute(
+            update(models.OutboxMessage)
+            .where(models.OutboxMessage.id.in_([message.id for message in messages]))
+            .values(available_at=now + timedelta(seconds=CLAIM_SECONDS))
+        )
+    db.commit()
+    return messages
+
+
+def deliver(backend: DeliveryBackend, message: Row, max_attempts: int) -> dict[str, Any]:
+    # Без базы: возвращает новые значения колонок сообщения
+    attempts = message.attempts + 1
+    try:
+        backend.send(message.topic, json.loads(message.payload))
+    except Exception as error:
+        logger.warning("Не удалось доставить сообщение %s (попытка %s): %s", message.id, attempts, error)
+        return {
+            "status": "failed" if attempts >= max_attempts else "pending",
+            "attempts": attempts,
+            "last_error": f"{type(error).__name__}: {error}"[:1000],
+            "available_at": datetime.utcnow() + backoff(attempts),
+        }
+    return {"status": "delivered", "delivered_at": datetime.utcnow(), "attempts": attempts}
+
+
+def record_result(db: Session, message_id: int, values: dict[str, Any]) -> None:
+    db.execute(update(models.OutboxMessage).where(models.OutboxMessage.id == message_id).values(**values))
+    db.commit()
+
+
+def drain_once(db: Session, backend: DeliveryBackend, batch_size: int, max_attempts: int) -> int:
+    """Доставляет одну пачку готовых к отправке сообщений, возвращает число обработанных.
+
+    Отправка идёт вне транзакции: соединение и блокировка записи SQLite не
+    удерживаются, пока бэкенд ждёт почтовый сервер.
+    """
+    messages = claim_batch(db, batch_size)
+    for message in messages:
+        record_result(db, message.id, deliver(backend, message, max_attempts))
+    return len(messages)
+
+
+def purge_delivered(db: Session, before: datetime, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    # Доставленные сообщения больше не нужны; удаляем пачками, чтобы не держать блокировку записи
+    total = 0
+    while True:
+        ids = db.scalars(
+            select(models.OutboxMessage.id)
+            .where(models.OutboxMessage.status == "delivered", models.OutboxMessage.delivered_at < before)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return total
+        db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+
+
+def purge_cutoff() -> datetime | None:
+    days = get_settings().outbox_retention_days
+    return datetime.utcnow() - timedelta(days=days) if days > 0 else None
+
+
+def run_drain(backend: DeliveryBackend) -> int:
+    settings = get_settings()
+    db = WriterSessionLocal()
+    try:
+        return drain_once(db, backend, settings.outbox_batch_size, settings.outbox_max_attempts)
+    finally:
+        db.close()
+
+
+def run_purge() -> int:
+    cutoff = purge_cutoff()
+    if cutoff is None:
+        return 0
+    db = WriterSessionLocal()
+    try:
+        return purge_delivered(db, cutoff)
+    finally:
+        db.close()
+
+
+def outbox_stats(db: Session) -> dict[str, int]:
+    rows = db.execute(
+        select(models.OutboxMessage.status, func.count()).group_by(models.OutboxMessage.status)
+    ).all()
+    return {"pending": 0, "delivered": 0, "failed": 0, **{status: count for status, count in rows}}
+
+
+async def drain_async(backend: DeliveryBackend) -> int:
+    # DB_MODE=async: записи идут через async_writer_engine — второй, синхронный писатель
+    # рядом с ним нарушил бы очередь записи SQLite. Отправка — в threadpool
+    settings = get_settings()
+    async with AsyncWriterSessionLocal() as db:
+        messages = await db.run_sync(claim_batch, settings.outbox_batch_size)
+        for message in messages:
+            values = await run_in_threadpool(deliver, backend, message, settings.outbox_max_attempts)
+            await db.run_sync(record_result, message.id, values)
+    return len(messages)
+
+
+async def purge_async() -> int:
+    cutoff = purge_cutoff()
+    if cutoff is None:
+        return 0
+    async with AsyncWriterSessionLocal() as db:
+        return await db.run_sync(purge_delivered, cutoff)
+
+
+async def drain_periodically(poll_seconds: float) -> None:
+    backend = make_backend()
+    use_async = AsyncWriterSessionLocal is not None
+    next_purge = 0.0
+    while True:
+        try:
+            # Полная пачка — значит, в очереди есть ещё; забираем без паузы
+            while (
+                await (drain_async(backend) if use_async else run_in_threadpool(run_drain, backend))
+                >= get_settings().outbox_batch_size
+            ):
+                pass
+            if time.monotonic() >= next_purge:
+                purged = await (purge_async() if use_async else run_in_threadpool(run_purge))
+                if purged:
+                    logger.info("Удалено доставленных сообщений outbox: %s", purged)
+                next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        except Exception:
+            logger.exception("Ошибка обработчика outbox")
+        await asyncio.sleep(poll_seconds)
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="один проход по очереди и выход")
+    parser.add_argument("--poll", type=float, default=settings.outbox_poll_seconds, help="пауза между проходами, сек")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    backend = make_backend()
+    next_purge = 0.0
+    while True:
+        processed = run_drain(backend)
+        if args.once:
+            while processed >= settings.outbox_batch_size:
+                processed = run_drain(backend)
+            run_purge()
+            return
+        if time.monotonic() >= next_purge:
+            run_purge()
+            next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        if processed < settings.outbox_batch_size:
+            time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Границы гистограммы ожидания соединения, в секундах
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+class PoolStats:
+    """Счётчики пула соединений: ожидание выдачи, занятые соединения, переполнение."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.overflow_checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.pool_size = 0
+        self.max_overflow = 0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for index, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[index] += 1
+                    break
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def on_connect(self, *_: Any) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_checkout(self, overflow: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            if overflow > 0:
+                self.overflow_checkouts += 1
+
+    def on_checkin(self, *_: Any) -> None:
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, *_: Any) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "overflow_checkouts": self.overflow_checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_buckets": {
+                    ("+Inf" if bound == float("inf") else str(bound)): count
+                    for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)
+                },
+            }
+
+
+class TimedCheckoutMixin:
+    # Событий «до выдачи соединения» в SQLAlchemy нет, поэтому время ожидания
+    # меряется вокруг Pool.connect(); класс пула сохраняется при Pool.recreate()
+    stats: PoolStats
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+
+def timed_pool_class(base: type[Pool], stats: PoolStats) -> type[Pool]:
+    return type(f"Timed{base.__name__}", (TimedCheckoutMixin, base), {"stats": stats})
+
+
+def instrument_engine(engine: Engine, stats: PoolStats) -> None:
+    pool = engine.pool
+    stats.pool_size = pool.size() if hasattr(pool, "size") else 0
+    stats.max_overflow = getattr(pool, "_max_overflow", 0)
+
+    def on_checkout(*_: Any) -> None:
+        # Пул может быть пересоздан (engine.dispose), поэтому берём текущий
+        current = engine.pool
+        stats.record_checkout(current.overflow() if hasattr(current, "overflow") else 0)
+
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+# Пулы единственного писателя SQLite (см. app.database)
+sync_writer_pool_stats = PoolStats()
+async_writer_pool_stats = PoolStats()
@@ -0,0 +1,200 @@
+"""Профилирование SQL по запросам: медленные запросы и кандидаты в N+1.
+
+Каждый SQL-запрос, выполненный при обработке HTTP-запроса, группируется по
+нормализованному тексту (литералы и параметры заменены на ``?``, списки IN
+свёрнуты). Запросы дольше SLOW_QUERY_MS пишутся в лог, а одинаковые запросы,
+повторённые N_PLUS_ONE_THRESHOLD и более раз, — как кандидаты в N+1 вместе с
+маршрутом.
+
+Включается настройкой QUERY_PROFILING=true для всех запросов или для одного
+запроса заголовками ``X-Query-Profile: 1`` и ``X-Admin-Token``; тогда в ответ
+добавляется ``X-Query-Count``. В тестах::
+
+    with assert_max_queries(3):
+        client.get("/experts")
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-query-profile"
+ADMIN_HEADER = b"x-admin-token"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# ? (sqlite), %(name)s / %s (psycopg), :name
+_BIND_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    text = _STRING_LITERAL.sub("?", statement)
+    text = _BIND_PARAM.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _IN_LIST.sub("IN (?)", text)
+
+
+class StatementGroup:
+    __slots__ = ("count", "seconds", "max_seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+
+class QueryProfile:
+    """SQL одного HTTP-запроса (или блока в тесте), сгруппированный по нормализованному тексту."""
+
+    def __init__(self, route: str = "") -> None:
+        self.route = route
+        self.groups: dict[str, StatementGroup] = {}
+        self.slow: list[tuple[str, float]] = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, statement: str, seconds: float, slow_threshold: float) -> None:
+        normalized = normalize_statement(statement)
+        group = self.groups.get(normalized)
+        if group is None:
+            group = self.groups[normalized] = StatementGroup()
+        group.count += 1
+        group.seconds += seconds
+        group.max_seconds = max(group.max_seconds, seconds)
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= slow_threshold:
+            self.slow.append((normalized, seconds))
+
+    def repeated(self, threshold: int) -> list[tuple[str, StatementGroup]]:
+        return sorted(
+            ((text, group) for text, group in self.groups.items() if group.count >= threshold),
+            key=lambda item: item[1].count,
+            reverse=True,
+        )
+
+    def summary(self) -> str:
+        lines = [f"{self.count} SQL за {self.seconds * 1000:.1f} мс ({self.route or 'вне запроса'}):"]
+        for text, group in sorted(self.groups.items(), key=lambda item: item[1].count, reverse=True):
+            lines.append(f"  {group.count}× {group.seconds * 1000:.1f} мс  {text}")
+        return "\n".join(lines)
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar("current_profile", default=None)
+
+# Профили, собираемые в тестах: TestClient обслуживает запросы в другом потоке,
+# куда ContextVar теста не попадает, поэтому middleware отдаёт профили сюда
+_collectors: list[list[QueryProfile]] = []
+_collectors_lock = threading.Lock()
+
+
+def instrument_profiling(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            conn.info.setdefault("profile_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        started = conn.info.get("profile_started_at")
+        if profile is None or not started:
+            return
+        settings = get_settings()
+        profile.record(statement, time.perf_counter() - started.pop(), settings.slow_query_ms / 1000)
+
+
+def report(profile: QueryProfile) -> None:
+    settings = get_settings()
+    for text, seconds in profile.slow:
+        logger.warning("Медленный SQL (%.1f мс) в %s: %s", seconds * 1000, profile.route, text)
+    for text, group in profile.repeated(settings.n_plus_one_threshold):
+        logger.warning("Возможный N+1 в %s: %s раз выполнен %s", profile.route, group.count, text)
+
+
+@contextmanager
+def capture_queries() -> Iterator[list[QueryProfile]]:
+    """Собирает профили всех HTTP-запросов внутри блока и SQL, выполненный прямо в нём."""
+    profiles: list[QueryProfile] = []
+    direct = QueryProfile()
+    token = current_profile.set(direct)
+    with _collectors_lock:
+        _collectors.append(profiles)
+    try:
+        yield profiles
+    finally:
+        with _collectors_lock:
+            _collectors.remove(profiles)
+        current_profile.reset(token)
+        if direct.count:
+            profiles.append(direct)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[list[QueryProfile]]:
+    with capture_queries() as profiles:
+        yield profiles
+    total = sum(profile.count for profile in profiles)
+    if total > limit:
+        details = "\n".join(profile.summary() for profile in profiles)
+        raise AssertionError(f"Ожидалось не больше {limit} SQL-запросов, выполнено {total}:\n{details}")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def enabled_for(self, scope) -> tuple[bool, bool]:
+        settings = get_settings()
+        headers = dict(scope.get("headers") or [])
+        by_header = (
+            headers.get(PROFILE_HEADER, b"").lower() in (b"1", b"true", b"yes")
+            and headers.get(ADMIN_HEADER, b"").decode("latin-1") == settings.admin_token
+        )
+        return settings.query_profiling or by_header or bool(_collectors), by_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        enabled, by_header = self.enabled_for(scope)
+        if not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_wrapper(message):
+            # Тело может стримиться дальше, поэтому счётчик в заголовке — на момент ответа
+            if by_header and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(profile.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            profile.route = f"{scope['method']} {route_label(scope)}"
+            report(profile)
+            with _collectors_lock:
+                for profiles in _collectors:
+                    profiles.append(profile)
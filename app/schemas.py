@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, time
+from typing import Literal, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 
 
 class SlotBase(BaseModel):
@@ -15,11 +15,83 @@ class SlotCreate(SlotBase):
     expert_id: int
 
 
+class SlotWindow(SlotBase):
+    # Окно расписания при импорте: без end_at — один слот, иначе нарезка по duration_minutes
+    end_at: datetime | None = None
+
+    @model_validator(mode="after")
+    def check_window(self) -> SlotWindow:
+        if self.end_at is not None and self.end_at <= self.start_at:
+            raise ValueError("Конец окна должен быть позже начала")
+        return self
+
+
 class SlotBatchCreate(BaseModel):
-    expert_id: int
+    expert_id: int | None = None
+    expert_ids: list[int] = Field(default_factory=list)
     start_at: datetime
     end_at: datetime
     slot_duration_minutes: int = Field(ge=5, le=240, default=30)
+    # Повторяющееся расписание: дни недели (0 — понедельник) и дневное окно
+    weekdays: list[int] | None = None
+    day_start: time | None = None
+    day_end: time | None = None
+
+    @model_validator(mode="after")
+    def check_schedule(self) -> SlotBatchCreate:
+        if self.expert_id is None and not self.expert_ids:
+            raise ValueError("Укажите expert_id или expert_ids")
+        if (self.day_start is None) != (self.day_end is None):
+            raise ValueError("Нужно указать и начало, и конец дневного окна")
+        if self.day_start is not None and self.day_end <= self.day_start:
+            raise ValueError("Конец дневного окна должен быть позже начала")
+        if self.weekdays is not None and any(day < 0 or day > 6 for day in self.weekdays):
+            raise ValueError("Дни недели задаются числами от 0 (пн) до 6 (вс)")
+        if self.weekdays is not None and self.day_start is None:
+            raise ValueError("Для дней недели укажите дневное окно day_start/day_end")
+        return self
+
+    @property
+    def is_recurring(self) -> bool:
+        return self.day_start is not None
+
+    def target_expert_ids(self) -> list[int]:
+        ids = list(self.expert_ids)
+        if self.expert_id is not None:
+            ids.insert(0, self.expert_id)
+        return list(dict.fromkeys(ids))
+
+
+class SlotBatchResult(BaseModel):
+    created: int
+    expert_ids: list[int]
+    first_start_at: datetime
+    last_start_at: datetime
+    slot_ids: list[int]
+
+
+class OverlappingSlot(BaseModel):
+    # id нет у слота, который ещё только создаётся в том же запросе
+    id: int | None = None
+    start_at: datetime
+    duration_minutes: int
+
+
+class SlotConflict(BaseModel):
+    expert_id: int
+    start_at: datetime
+    duration_minutes: int
+    overlaps: list[OverlappingSlot]
+
+
+class SlotSearchResult(BaseModel):
+    id: int
+    expert_id: int
+    start_at: datetime
+    duration_minutes: int
+    full_name: str
+    expertise_area: str
+    meeting_room: str | None = None
 
 
 class SlotUpdate(BaseModel):
@@ -36,6 +108,11 @@ class SlotRead(SlotBase):
         from_attributes = True
 
 
+class SlotPage(BaseModel):
+    items: list[SlotRead]
+    next_cursor: str | None = None
+
+
 class ExpertBase(BaseModel):
     full_name: str
     expertise_area: str
@@ -67,6 +144,24 @@ class ExpertWithSlots(ExpertRead):
     slots: list[SlotRead]
 
 
+class AvailabilityExpert(BaseModel):
+    id: int
+    full_name: Optional[str] = None
+    expertise_area: Optional[str] = None
+    bio: Optional[str] = None
+    contact_info: Optional[str] = None
+    meeting_room: Optional[str] = None
+    # Параллельные массивы: i-й слот начинается через offsets[i] минут после base
+    slot_ids: list[int]
+    offsets: list[int]
+    durations: list[int]
+
+
+class AvailabilityResponse(BaseModel):
+    base: datetime
+    experts: list[AvailabilityExpert]
+
+
 class BookingBase(BaseModel):
     student_name: str = Field(min_length=2)
     student_email: EmailStr
@@ -90,6 +185,125 @@ class BookingRead(BookingBase):
         from_attributes = True
 
 
+class ScheduleBooking(BaseModel):
+    # Без почты студента и кода отмены: расписание видят эксперты
+    id: int
+    slot_id: int
+    student_name: str
+    question: str
+    vkr_type: Optional[str] = None
+    magistracy: Optional[str] = None
+    artifacts_link: Optional[str] = None
+    created_at: datetime
+
+
+class ScheduleSlot(SlotRead):
+    booking: ScheduleBooking | None = None
+
+
+class ExpertSchedule(ExpertRead):
+    date_from: datetime
+    date_to: datetime
+    slots: list[ScheduleSlot]
+
+
 class BookingAdminUpdate(BaseModel):
     question: Optional[str] = Field(default=None, min_length=5)
     slot_id: Optional[int] = None
+
+
+class BookingPage(BaseModel):
+    items: list[BookingRead]
+    next_cursor: str | None = None
+
+
+class ArchivedSlotRead(BaseModel):
+    id: int
+    original_id: int
+    expert_id: int
+    expert_name: str
+    start_at: datetime
+    duration_minutes: int
+    archived_at: datetime
+
+
+class ArchivedSlotPage(BaseModel):
+    items: list[ArchivedSlotRead]
+    next_cursor: str | None = None
+
+
+class ArchivedBookingRead(BookingRead):
+    original_id: int
+    archived_slot_id: int
+    archived_at: datetime
+
+
+class ArchivedBookingPage(BaseModel):
+    items: list[ArchivedBookingRead]
+    next_cursor: str | None = None
+
+
+class BulkSelection(BaseModel):
+    # Либо явный список id, либо фильтр по эксперту и/или периоду начала слота
+    ids: list[int] = Field(default_factory=list, max_length=5000)
+    expert_id: int | None = None
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+
+    @model_validator(mode="after")
+    def check_selection(self) -> BulkSelection:
+        if not self.ids and self.expert_id is None and self.date_from is None and self.date_to is None:
+            raise ValueError("Укажите ids или фильтр expert_id/date_from/date_to")
+        if self.date_from and self.date_to and self.date_to < self.date_from:
+            raise ValueError("date_to должна быть не раньше date_from")
+        return self
+
+
+class SlotBulkDelete(BulkSelection):
+    # Удалять и занятые слоты вместе с записями
+    include_booked: bool = False
+
+
+class SlotBulkShift(BulkSelection):
+    offset_minutes: int = Field(ge=-525600, le=525600)
+
+    @model_validator(mode="after")
+    def check_offset(self) -> SlotBulkShift:
+        if self.offset_minutes == 0:
+            raise ValueError("Сдвиг не может быть нулевым")
+        return self
+
+
+class SlotBulkReassign(BulkSelection):
+    target_expert_id: int
+
+
+class BookingBulkDelete(BulkSelection):
+    pass
+
+
+class BulkItemResult(BaseModel):
+    id: int
+    status: Literal["ok", "not_found", "booked", "conflict"]
+
+
+class BulkResult(BaseModel):
+    matched: int
+    succeeded: int
+    items: list[BulkItemResult]
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class ImportResult(BaseModel):
+    dry_run: bool
+    committed: bool
+    rows: int
+    experts_created: int
+    experts_updated: int
+    slots_created: int
+    errors: list[ImportRowError]
+    errors_truncated: bool = False
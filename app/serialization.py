@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import gzip
+from typing import Any, Iterable, Mapping
+
+from pydantic_core import to_json
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.assets import choose_encoding
+
+# Ответы меньше этого размера не сжимаем: выигрыш меньше накладных расходов
+COMPRESS_MIN_BYTES = 1024
+JSON_MEDIA_TYPE = "application/json"
+
+
+def rows_to_dicts(rows: Iterable[Any]) -> list[dict[str, Any]]:
+    return [dict(row._mapping) if not isinstance(row, Mapping) else dict(row) for row in rows]
+
+
+def dump_json(data: Any) -> bytes:
+    # Строки из SQL сериализуются за один проход в pydantic-core, без построения
+    # моделей и повторной валидации по response_model
+    return to_json(data)
+
+
+def compress_variants(body: bytes) -> dict[str, bytes]:
+    if len(body) < COMPRESS_MIN_BYTES:
+        return {}
+    return {"gzip": gzip.compress(body, compresslevel=6, mtime=0)}
+
+
+def json_response(
+    request: Request,
+    body: bytes,
+    encodings: dict[str, bytes] | None = None,
+    headers: dict[str, str] | None = None,
+    status_code: int = 200,
+) -> Response:
+    headers = dict(headers or {})
+    if encodings is None:
+        encodings = compress_variants(body)
+    if encodings:
+        headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("accept-encoding"), encodings)
+    if encoding:
+        body = encodings[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers=headers)
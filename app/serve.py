@@ -0,0 +1,144 @@
+"""Запуск нескольких воркеров с предзагрузкой приложения.
+
+    python -m app.serve                       # WEB_WORKERS воркеров на HOST:PORT
+    python -m app.serve --workers 4 --port 8000
+
+Родительский процесс один раз импортирует приложение (настройки, манифест
+статики, движок), проверяет схему и открывает сокет, затем форкает воркеры.
+Каждый воркер сбрасывает унаследованный пул и открывает свои соединения,
+а изменения данных рассылает остальным через app.cluster. Упавший воркер
+перезапускается; SIGTERM/SIGINT корректно останавливают всех.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.config import get_settings
+
+logger = logging.getLogger("app.serve")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index: int, sock: socket.socket) -> None:
+    os.environ["WORKER_INDEX"] = str(index)
+    from app.database import async_engine, async_writer_engine, engine, use_writer, writer_engine
+    from app.main import app
+
+    # Соединения родителя нельзя делить между процессами — каждый воркер открывает свой пул
+    engine.dispose(close=False)
+    if use_writer:
+        writer_engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+        if use_writer:
+            async_writer_engine.sync_engine.dispose(close=False)
+
+    config = uvicorn.Config(app, lifespan="on", log_level="info", proxy_headers=True)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn(index: int, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(index, sock)
+        except BaseException:
+            logger.exception("Воркер %s завершился с ошибкой", index)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def preload() -> None:
+    # Всё, что достаточно сделать один раз: импорт, сборка манифеста статики, проверка схемы
+    from app.database import engine
+    from app.main import app  # noqa: F401
+    from app.migrate import check_schema
+
+    check_schema(engine, get_settings().auto_migrate)
+    engine.dispose()
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    if workers <= 1 or not hasattr(os, "fork"):
+        os.environ["WORKER_INDEX"] = "0"
+        uvicorn.run("app.main:app", host=host, port=port, proxy_headers=True)
+        return
+
+    preload()
+    sock = bind_socket(host, port)
+    children: dict[int, int] = {}
+    stopping = False
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        children[spawn(index, sock)] = index
+    logger.info("Запущено воркеров: %s на %s:%s", workers, host, port)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        logger.warning("Воркер %s (pid %s) завершился с кодом %s, перезапуск", index, pid, os.waitstatus_to_exitcode(status))
+        time.sleep(1)
+        children[spawn(index, sock)] = index
+    sock.close()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.web_workers)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    if args.workers != settings.web_workers:
+        # Воркеры читают WEB_WORKERS, чтобы решить, нужен ли канал инвалидации
+        os.environ["WEB_WORKERS"] = str(args.workers)
+        get_settings.cache_clear()
+    serve(args.host, args.port, args.workers)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Генератор синтетических данных для бенчмарков.
+
+Заполняет схему ``app.models`` напрямую через bulk INSERT: эксперты × слоты на
+эксперта × доля занятых слотов, включая годы прошедших консультаций.
+
+    python -m benchmarks.datagen --database-url sqlite:///./data/bench.db --experts 300 --slots-per-expert 2000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from secrets import token_hex
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+
+AREAS = ["Машинное обучение", "Аналитика данных", "Продуктовый менеджмент", "Бэкенд", "Дизайн", "Исследования"]
+
+
+@dataclass
+class DatasetConfig:
+    experts: int = 100
+    slots_per_expert: int = 500
+    booking_ratio: float = 0.4
+    past_fraction: float = 0.8
+    slot_minutes: int = 30
+    seed: int = 42
+
+
+@dataclass
+class DatasetSummary:
+    experts: int
+    slots: int
+    bookings: int
+    future_free_slot_ids: list[int]
+    expert_ids: list[int]
+
+
+def _slot_starts(count: int, past_fraction: float, slot_minutes: int, now: datetime) -> list[datetime]:
+    # Слоты идут подряд в рабочие часы (10:00–18:00) по будням; начало отстоит в прошлое
+    # так, чтобы заданная доля слотов оказалась прошедшей
+    per_day = (8 * 60) // slot_minutes
+    past_days = int(count * past_fraction / per_day * 7 / 5) + 1
+    day = (now - timedelta(days=past_days)).replace(hour=10, minute=0, second=0, microsecond=0)
+    starts: list[datetime] = []
+    while len(starts) < count:
+        if day.weekday() < 5:
+            for index in range(per_day):
+                starts.append(day + timedelta(minutes=index * slot_minutes))
+                if len(starts) == count:
+                    break
+        day += timedelta(days=1)
+    return starts
+
+
+def generate(engine: Engine, config: DatasetConfig, batch_size: int = 5000) -> DatasetSummary:
+    # app.database создаёт движок по DATABASE_URL при импорте, поэтому модели
+    # импортируются только здесь — после того как вызывающий код выставил окружение
+    from app import models
+    from app.migrate import migrate
+
+    rng = random.Random(config.seed)
+    now = datetime.utcnow()
+    migrate(engine)
+
+    with engine.begin() as conn:
+        expert_rows = [
+            {
+                "full_name": f"Эксперт {index:05d}",
+                "expertise_area": rng.choice(AREAS),
+                "bio": "Синтетический эксперт для нагрузочных тестов. " * 3,
+                "contact_info": f"expert{index}@example.com",
+                "meeting_room": f"https://meet.example.com/room-{index}",
+            }
+            for index in range(config.experts)
+        ]
+        expert_ids = list(conn.scalars(insert(models.Expert).returning(models.Expert.id), expert_rows))
+
+        starts = _slot_starts(config.slots_per_expert, config.past_fraction, config.slot_minutes, now)
+        slot_rows = []
+        total_slots = 0
+        booked_slot_ids: list[int] = []
+        free_future: list[int] = []
+
+        def flush() -> None:
+            nonlocal slot_rows, total_slots
+            if not slot_rows:
+                return
+            created = conn.execute(
+                insert(models.Slot).returning(models.Slot.id, models.Slot.start_at), slot_rows
+            ).all()
+            total_slots += len(created)
+            for row in created:
+                if rng.random() < config.booking_ratio:
+                    booked_slot_ids.append(row.id)
+                elif row.start_at > now:
+                    free_future.append(row.id)
+            slot_rows = []
+
+        for expert_id in expert_ids:
+            for start_at in starts:
+                slot_rows.append(
+                    {"expert_id": expert_id, "start_at": start_at, "duration_minutes": config.slot_minutes}
+                )
+                if len(slot_rows) >= batch_size:
+                    flush()
+        flush()
+
+        for offset in range(0, len(booked_slot_ids), batch_size):
+            chunk = booked_slot_ids[offset:offset + batch_size]
+            conn.execute(
+                insert(models.Booking),
+                [
+                    {
+                        "slot_id": slot_id,
+                        "student_name": f"Студент {slot_id}",
+                        "student_email": f"student{slot_id}@example.com",
+                        "question": "Синтетический запрос для нагрузочного теста",
+                        "vkr_type": "Проект",
+                        "magistracy": "Наука о данных",
+                        "artifacts_link": "https://example.com/artifacts",
+                        "cancellation_code": token_hex(3),
+                        "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+                    }
+                    for slot_id in chunk
+                ],
+            )
+
+    return DatasetSummary(
+        experts=len(expert_ids),
+        slots=total_slots,
+        bookings=len(booked_slot_ids),
+        future_free_slot_ids=free_future,
+        expert_ids=expert_ids,
+    )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DatasetConfig()
+    parser.add_argument("--experts", type=int, default=defaults.experts)
+    parser.add_argument("--slots-per-expert", type=int, default=defaults.slots_per_expert)
+    parser.add_argument("--booking-ratio", type=float, default=defaults.booking_ratio)
+    parser.add_argument("--past-fraction", type=float, default=defaults.past_fraction,
+                        help="доля прошедших слотов (история за прошлые семестры)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> DatasetConfig:
+    return DatasetConfig(
+        experts=args.experts,
+        slots_per_expert=args.slots_per_expert,
+        booking_ratio=args.booking_ratio,
+        past_fraction=args.past_fraction,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    summary = generate(create_engine(args.database_url), config)
+    print({**asdict(config), "slots": summary.slots, "bookings": summary.bookings})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Проверка числа SQL-запросов на горячих эндпоинтах.
+
+Засевает временную базу (``benchmarks.datagen``) и через ``httpx.ASGITransport``
+вызывает эндпоинты внутри ``app.profiling.assert_max_queries``. Бюджеты не
+зависят от объёма данных: списки экспертов и доступности собираются фиксированным
+числом запросов (эксперты + слоты), страницы /slots и /bookings — одним. Если
+какой-то эндпоинт вышел за бюджет (например, вернулся N+1), скрипт печатает
+профиль запросов и завершается с кодом 1.
+
+    python -m benchmarks.query_budget
+    python -m benchmarks.query_budget --db-mode async --experts 50 --slots-per-expert 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks import datagen
+
+ADMIN_TOKEN = "bench-admin"
+
+# (путь, бюджет SQL-запросов, нужен ли админский токен)
+BUDGETS = [
+    ("/experts?horizon_days=365", 2, False),
+    ("/experts?include_slots=false", 1, False),
+    ("/availability", 2, False),
+    ("/availability?horizon_days=30&fields=full_name,expertise_area,bio", 2, False),
+    ("/slots?limit=100", 1, False),
+    ("/slots?limit=100&is_available=true", 1, False),
+    ("/bookings?limit=100", 1, True),
+]
+
+
+async def check(args: argparse.Namespace) -> list[str]:
+    tmpdir = tempfile.TemporaryDirectory()
+    database_url = args.database_url or f"sqlite:///{tmpdir.name}/budget.db"
+    # Кэш снимков выключен: иначе повторный запрос не дойдёт до базы и бюджет ничего не проверит
+    os.environ.update({
+        "DATABASE_URL": database_url,
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        "DB_MODE": args.db_mode,
+        "AVAILABILITY_CACHE_TTL": "0",
+    })
+
+    from sqlalchemy import create_engine
+
+    datagen.generate(create_engine(database_url), datagen.config_from_args(args))
+
+    from app.main import app
+    from app.profiling import assert_max_queries
+
+    failures = []
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for path, limit, admin in BUDGETS:
+                headers = {"X-Admin-Token": ADMIN_TOKEN} if admin else {}
+                try:
+                    with assert_max_queries(limit) as profiles:
+                        response = await client.get(path, headers=headers)
+                except AssertionError as exc:
+                    failures.append(f"{path}: {exc}")
+                    print(f"FAIL {path}")
+                    continue
+                if response.status_code != 200:
+                    failures.append(f"{path}: HTTP {response.status_code}")
+                    print(f"FAIL {path}: HTTP {response.status_code}")
+                    continue
+                total = sum(profile.count for profile in profiles)
+                print(f"ok   {path}: {total} из {limit} SQL-запросов")
+    finally:
+        tmpdir.cleanup()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    # Небольшой набор по умолчанию: бюджет от объёма не зависит, а засев должен быть быстрым
+    parser.set_defaults(experts=20, slots_per_expert=50)
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    args = parser.parse_args()
+
+    failures = asyncio.run(check(args))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Бенчмарк основных эндпоинтов на синтетических данных.
+
+Засевает временную базу (``benchmarks.datagen``), затем гоняет эндпоинты либо
+внутри процесса через ``httpx.ASGITransport``, либо через локальный uvicorn, и
+пишет в JSON пропускную способность, перцентили задержек и число SQL-запросов
+на запрос (по счётчикам ``/metrics``). Результаты разных коммитов сравниваются
+по полю ``git_commit``.
+
+    python -m benchmarks.run --experts 300 --slots-per-expert 2000 --output bench.json
+    python -m benchmarks.run --transport uvicorn --db-mode async --no-cache
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from benchmarks import datagen
+from benchmarks.booking_storm import free_port, percentile, start_server, wait_ready
+
+ROOT = Path(__file__).resolve().parent.parent
+ADMIN_TOKEN = "bench-admin"
+METRIC_LINE = re.compile(r'^db_statements_total\{method="(?P<method>[^"]+)",route="(?P<route>[^"]+)"\} (?P<value>\S+)$')
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def db_statements(client: httpx.AsyncClient) -> dict[tuple[str, str], float]:
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return {}
+    counters = {}
+    for line in response.text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            counters[(match["method"], match["route"])] = float(match["value"])
+    return counters
+
+
+def build_scenarios(summary: datagen.DatasetSummary, args: argparse.Namespace) -> list[dict]:
+    rng = random.Random(args.seed)
+    admin = {"X-Admin-Token": ADMIN_TOKEN}
+    free_slots = list(summary.future_free_slot_ids)
+    rng.shuffle(free_slots)
+
+    def expert_id() -> int:
+        return rng.choice(summary.expert_ids)
+
+    def book_request() -> tuple[str, str, dict]:
+        slot_id = free_slots.pop() if free_slots else 0
+        payload = {
+            "student_name": "Бенчмарк",
+            "student_email": "bench@example.com",
+            "question": "Запрос из бенчмарка",
+        }
+        return "POST", f"/slots/{slot_id}/book", {"json": payload}
+
+    return [
+        {"name": "list_experts", "route": "/experts",
+         "make": lambda: ("GET", f"/experts?horizon_days={args.horizon_days}", {})},
+        {"name": "list_slots", "route": "/slots",
+         "make": lambda: ("GET", "/slots?limit=100", {})},
+        {"name": "list_bookings", "route": "/bookings",
+         "make": lambda: ("GET", "/bookings?limit=100", {"headers": admin})},
+        {"name": "expert_bookings", "route": "/experts/{expert_id}/bookings",
+         "make": lambda: ("GET", f"/experts/{expert_id()}/bookings", {})},
+        {"name": "book_slot", "route": "/slots/{slot_id}/book", "make": book_request},
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: dict, requests: int, concurrency: int) -> dict:
+    make: Callable[[], tuple[str, str, dict]] = scenario["make"]
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in pending:
+            method, url, kwargs = make()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    before = await db_statements(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await db_statements(client)
+
+    http_method = "POST" if scenario["name"] == "book_slot" else "GET"
+    key = (http_method, scenario["route"])
+    queries = after.get(key, 0.0) - before.get(key, 0.0)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+        "sql_per_request": round(queries / len(latencies), 2) if latencies and after else None,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def drive(base_url: str, transport: httpx.AsyncBaseTransport | None, summary, args) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=120) as client:
+        for scenario in build_scenarios(summary, args):
+            if args.only and scenario["name"] not in args.only:
+                continue
+            # Прогрев: первые запросы платят за импорт, компиляцию SQL и заполнение кэшей
+            for _ in range(min(args.warmup, args.requests)):
+                method, url, kwargs = scenario["make"]()
+                if method == "GET":
+                    await client.request(method, url, **kwargs)
+            results[scenario["name"]] = await run_scenario(client, scenario, args.requests, args.concurrency)
+            print(scenario["name"], results[scenario["name"]], file=sys.stderr)
+    return results
+
+
+async def run(args: argparse.Namespace) -> dict:
+    tmpdir = tempfile.TemporaryDirectory()
+    database_url = args.database_url or f"sqlite:///{tmpdir.name}/bench.db"
+    env = {
+        "DATABASE_URL": database_url,
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+        "DB_MODE": args.db_mode,
+        "METRICS_ENABLED": "true",
+        "AVAILABILITY_CACHE_TTL": "0" if args.no_cache else os.getenv("AVAILABILITY_CACHE_TTL", "30"),
+    }
+    os.environ.update(env)
+
+    from sqlalchemy import create_engine
+
+    config = datagen.config_from_args(args)
+    started = time.perf_counter()
+    summary = datagen.generate(create_engine(database_url), config)
+    seed_seconds = time.perf_counter() - started
+
+    try:
+        if args.transport == "asgi":
+            from app.main import app
+
+            results = await drive("http://bench", httpx.ASGITransport(app=app), summary, args)
+        else:
+            port = free_port()
+            server = start_server(database_url, port, args.workers, args.db_mode)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                await wait_ready(base_url)
+                results = await drive(base_url, None, summary, args)
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+    finally:
+        tmpdir.cleanup()
+
+    return {
+        "git_commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": sys.version.split()[0],
+        "transport": args.transport,
+        "db_mode": args.db_mode,
+        "database": database_url.split(":", 1)[0],
+        "cache": not args.no_cache,
+        "dataset": {**asdict(config), "slots": summary.slots, "bookings": summary.bookings,
+                    "seed_seconds": round(seed_seconds, 2)},
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    datagen.add_arguments(parser)
+    parser.add_argument("--database-url", default=None, help="по умолчанию временная SQLite")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--workers", type=int, default=1, help="только для --transport uvicorn")
+    parser.add_argument("--requests", type=int, default=200, help="запросов на каждый эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--horizon-days", type=int, default=365)
+    parser.add_argument("--no-cache", action="store_true", help="отключить кэш снимка /experts")
+    parser.add_argument("--only", nargs="*", help="запустить только указанные сценарии")
+    parser.add_argument("--output", type=Path, default=None, help="куда записать JSON с результатами")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,8 +28,19 @@ const adminBookingsContainer = document.getElementById("admin-bookings");
 const adminMessage = document.getElementById("admin-message");
 const adminRefreshBtn = document.getElementById("admin-refresh");
 const bookingExpertFilter = document.getElementById("bookingExpertFilter");
+const bookingsMoreBtn = document.getElementById("admin-bookings-more");
+
+const bulkForm = document.getElementById("bulk-form");
+const bulkExpertSelect = document.getElementById("bulkExpert");
+const bulkActionSelect = document.getElementById("bulkAction");
+const bulkOffsetInput = document.getElementById("bulkOffset");
+const bulkTargetSelect = document.getElementById("bulkTargetExpert");
+const bulkMessage = document.getElementById("bulk-message");
+
+const BOOKINGS_PAGE_SIZE = 50;
 
 let expertsCache = [];
+let bookingsNextCursor = null;
 
 const placeholderOption = '<option value="">Выберите эксперта</option>';
 
@@ -71,8 +82,14 @@ const populateExpertSelects = () => {
     const options = expertsCache.map((expert) => `<option value="${expert.id}">${expert.full_name}</option>`);
     slotExpertSelect.innerHTML = placeholderOption + options.join("");
     bookingExpertFilter.innerHTML = '<option value="">Все эксперты</option>' + options.join("");
+    const prevBulkExpert = bulkExpertSelect.value;
+    const prevBulkTarget = bulkTargetSelect.value;
+    bulkExpertSelect.innerHTML = placeholderOption + options.join("");
+    bulkTargetSelect.innerHTML = '<option value="">Кому передать</option>' + options.join("");
     restoreSelectValue(slotExpertSelect, prevSlotExpert);
     restoreSelectValue(bookingExpertFilter, prevFilter);
+    restoreSelectValue(bulkExpertSelect, prevBulkExpert);
+    restoreSelectValue(bulkTargetSelect, prevBulkTarget);
   }
   syncSlotFormState();
 };
@@ -235,9 +252,11 @@ const handleSlotDelete = async (slotId) => {
   }
 };
 
-const renderAdminBookings = (bookings) => {
-  adminBookingsContainer.innerHTML = "";
-  if (bookings.length === 0) {
+const renderAdminBookings = (bookings, append = false) => {
+  if (!append) {
+    adminBookingsContainer.innerHTML = "";
+  }
+  if (!append && bookings.length === 0) {
     adminBookingsContainer.innerHTML = "<p>Пока нет записей</p>";
     return;
   }
@@ -270,23 +289,80 @@ const renderAdminBookings = (bookings) => {
   });
 };
 
-const loadAdminBookings = async () => {
+const loadAdminBookings = async (append = false) => {
   try {
+    const headers = getAdminHeaders();
     const expertId = bookingExpertFilter.value;
+    const params = new URLSearchParams({ limit: String(BOOKINGS_PAGE_SIZE) });
     if (expertId) {
-      const bookings = await apiRequest(`/experts/${expertId}/bookings`);
-      renderAdminBookings(bookings);
+      params.set("expert_id", expertId);
+    }
+    if (append && bookingsNextCursor) {
+      params.set("cursor", bookingsNextCursor);
+    }
+    const page = await apiRequest(`/bookings?${params}`, { headers });
+    bookingsNextCursor = page.next_cursor;
+    bookingsMoreBtn.hidden = !bookingsNextCursor;
+    renderAdminBookings(page.items, append);
+    if (expertId && !append) {
       showMessage(adminMessage, "Фильтр по эксперту применён", "success");
-    } else {
-      const headers = getAdminHeaders();
-      const bookings = await apiRequest("/bookings", { headers });
-      renderAdminBookings(bookings);
     }
   } catch (error) {
     showMessage(adminMessage, error.message, "error");
   }
 };
 
+// Массовые операции выполняются на сервере одной транзакцией, а не запросом на каждую строку
+const BULK_ENDPOINTS = {
+  "delete-free": "/admin/slots/bulk-delete",
+  "delete-all": "/admin/slots/bulk-delete",
+  "delete-bookings": "/admin/bookings/bulk-delete",
+  shift: "/admin/slots/bulk-shift",
+  reassign: "/admin/slots/bulk-reassign",
+};
+
+const syncBulkFormState = () => {
+  bulkOffsetInput.hidden = bulkActionSelect.value !== "shift";
+  bulkTargetSelect.hidden = bulkActionSelect.value !== "reassign";
+};
+
+const handleBulkSubmit = async (event) => {
+  event.preventDefault();
+  const action = bulkActionSelect.value;
+  const payload = {};
+  if (bulkExpertSelect.value) payload.expert_id = Number(bulkExpertSelect.value);
+  // datetime-local — локальное время без пояса; сервер хранит UTC
+  const bulkFrom = document.getElementById("bulkFrom").value;
+  const bulkTo = document.getElementById("bulkTo").value;
+  if (bulkFrom) payload.date_from = new Date(bulkFrom).toISOString();
+  if (bulkTo) payload.date_to = new Date(bulkTo).toISOString();
+  if (Object.keys(payload).length === 0) {
+    showMessage(bulkMessage, "Выберите эксперта или период", "error");
+    return;
+  }
+  if (action === "delete-all") payload.include_booked = true;
+  if (action === "shift") payload.offset_minutes = Number(bulkOffsetInput.value);
+  if (action === "reassign") payload.target_expert_id = Number(bulkTargetSelect.value);
+  if (!confirm("Выполнить операцию для всех подходящих строк?")) return;
+  try {
+    const headers = getAdminHeaders();
+    const result = await apiRequest(BULK_ENDPOINTS[action], {
+      method: "POST",
+      headers,
+      body: JSON.stringify(payload),
+    });
+    const skipped = result.matched - result.succeeded;
+    showMessage(
+      bulkMessage,
+      `Обработано: ${result.succeeded} из ${result.matched}${skipped ? ` (пропущено занятых: ${skipped})` : ""}`,
+      "success",
+    );
+    await Promise.all([loadExperts(), loadAdminBookings()]);
+  } catch (error) {
+    showMessage(bulkMessage, error.message, "error");
+  }
+};
+
 const adminDeleteBooking = async (bookingId) => {
   if (!confirm("Удалить запись?")) return;
   try {
@@ -378,7 +454,7 @@ slotForm.addEventListener("submit", async (event) => {
       if (endValue <= new Date(startValue)) {
         throw new Error("Конец периода должен быть позже начала");
       }
-      await apiRequest("/slots/batch", {
+      const result = await apiRequest("/slots/batch", {
         method: "POST",
         headers,
         body: JSON.stringify({
@@ -388,7 +464,7 @@ slotForm.addEventListener("submit", async (event) => {
           slot_duration_minutes: duration,
         }),
       });
-      showMessage(adminMessage, "Слоты добавлены", "success");
+      showMessage(adminMessage, `Слоты добавлены: ${result.created}`, "success");
     } else {
       await apiRequest("/slots", {
         method: "POST",
@@ -410,8 +486,11 @@ slotForm.addEventListener("submit", async (event) => {
 
 slotCancelBtn.addEventListener("click", () => setSlotFormMode(null));
 
-adminRefreshBtn.addEventListener("click", loadAdminBookings);
-bookingExpertFilter.addEventListener("change", loadAdminBookings);
+adminRefreshBtn.addEventListener("click", () => loadAdminBookings());
+bookingExpertFilter.addEventListener("change", () => loadAdminBookings());
+bookingsMoreBtn.addEventListener("click", () => loadAdminBookings(true));
+bulkActionSelect.addEventListener("change", syncBulkFormState);
+bulkForm.addEventListener("submit", handleBulkSubmit);
 expertsRefreshBtn.addEventListener("click", () => loadExperts(true));
 logoutButton.addEventListener("click", async () => {
   await fetch("/admin/logout", { method: "POST" });
@@ -15,29 +15,25 @@ const renderExpertOptions = () => {
   expertSelect.disabled = expertsCache.length === 0;
 };
 
-const findSlot = (slotId) =>
-  expertsCache.flatMap((expert) => expert.slots).find((slot) => slot.id === slotId);
-
-const renderExpertBookings = (bookings) => {
+// Слоты и записи эксперта приходят одним ответом /experts/{id}/schedule
+const renderExpertBookings = (schedule) => {
   expertBookingsContainer.innerHTML = "";
-  if (bookings.length === 0) {
+  const bookedSlots = schedule.slots.filter((slot) => slot.booking);
+  if (bookedSlots.length === 0) {
     expertBookingsContainer.innerHTML = "<p>Записей пока нет</p>";
     return;
   }
-  bookings.forEach((booking) => {
-    const slot = findSlot(booking.slot_id);
+  bookedSlots.forEach((slot) => {
+    const { booking } = slot;
     const card = document.createElement("div");
     card.className = "expert-card";
     card.innerHTML = `
       <p><strong>Студент:</strong> ${booking.student_name}</p>
-      <p><strong>Почта:</strong> ${booking.student_email}</p>
       <p><strong>Запрос:</strong> ${booking.question}</p>
       ${booking.vkr_type ? `<p><strong>Тип ВКР(С):</strong> ${booking.vkr_type}</p>` : ""}
       ${booking.magistracy ? `<p><strong>Магистратура:</strong> ${booking.magistracy}</p>` : ""}
       ${booking.artifacts_link ? `<p><strong>Артефакты:</strong> <a href="${booking.artifacts_link}" target="_blank">${booking.artifacts_link}</a></p>` : ""}
-      <p><strong>Слот:</strong> ${
-        slot ? formatDateTime(slot.start_at) : `ID ${booking.slot_id}`
-      }</p>
+      <p><strong>Слот:</strong> ${formatDateTime(slot.start_at)}</p>
     `;
     expertBookingsContainer.appendChild(card);
   });
@@ -49,9 +45,10 @@ const loadBookings = async (expertId) => {
     return;
   }
   try {
-    const bookings = await apiRequest(`/experts/${expertId}/bookings`);
-    renderExpertBookings(bookings);
-    showMessage(expertMessage, "Список обновлён", "success");
+    const schedule = await apiRequest(`/experts/${expertId}/schedule`);
+    renderExpertBookings(schedule);
+    const freeSlots = schedule.slots.filter((slot) => slot.is_available).length;
+    showMessage(expertMessage, `Список обновлён. Свободных слотов: ${freeSlots}`, "success");
   } catch (error) {
     showMessage(expertMessage, error.message, "error");
   }
@@ -59,8 +56,7 @@ const loadBookings = async (expertId) => {
 
 const loadExperts = async () => {
   try {
-    const data = await apiRequest("/experts?horizon_days=365");
-    expertsCache = data;
+    expertsCache = await apiRequest("/experts?include_slots=false");
     renderExpertOptions();
   } catch (error) {
     showMessage(expertMessage, error.message, "error");
@@ -15,13 +15,18 @@ const downloadBookingBtn = document.getElementById("download-booking-info");
 const closePopupBtn = document.getElementById("close-popup");
 const selectedSlotInfo = document.getElementById("selected-slot-info");
 const selectedSlotDetails = document.getElementById("selected-slot-details");
+const searchForm = document.getElementById("search-form");
+const searchResults = document.getElementById("search-results");
 
 let expertsCache = [];
 let selectedSlotId = null;
 let selectedSlotData = null;
 let currentExpertIndex = 0;
 let lastBookingData = null;
+let liveUpdates = false;
 const MAX_VISIBLE_EXPERTS = 3;
+const HORIZON_DAYS = 365;
+const AVAILABILITY_FIELDS = "full_name,expertise_area,bio,contact_info,meeting_room";
 
 const renderExperts = () => {
   expertsWrapper.innerHTML = "";
@@ -107,12 +112,157 @@ const selectSlot = (slot, expert) => {
   renderExperts();
 };
 
+// Сервер отдаёт свободные слоты колонками: смещения в минутах от base и длительности
+const expandAvailability = (data) => {
+  const base = Date.parse(`${data.base}Z`);
+  return data.experts.map((expert) => ({
+    ...expert,
+    slots: expert.slot_ids.map((id, index) => ({
+      id,
+      expert_id: expert.id,
+      // Время без часового пояса, как и в остальных ответах API
+      start_at: new Date(base + expert.offsets[index] * 60000).toISOString().slice(0, 19),
+      duration_minutes: expert.durations[index],
+      is_available: true,
+    })),
+  }));
+};
+
 const loadExperts = async () => {
-  const data = await apiRequest("/experts?horizon_days=365");
-  expertsCache = data;
+  const data = await apiRequest(`/availability?horizon_days=${HORIZON_DAYS}&fields=${AVAILABILITY_FIELDS}`);
+  expertsCache = expandAvailability(data);
+  renderExperts();
+};
+
+const resetSelection = () => {
+  selectedSlotId = null;
+  selectedSlotData = null;
+  document.getElementById("slotId").value = "";
+  bookButton.disabled = true;
+  selectedSlotInfo.setAttribute("hidden", "");
+};
+
+const markSlotsTaken = (slotIds) => {
+  const ids = new Set(slotIds);
+  expertsCache.forEach((expert) => {
+    expert.slots.forEach((slot) => {
+      if (ids.has(slot.id)) slot.is_available = false;
+    });
+  });
+  if (selectedSlotId && ids.has(selectedSlotId)) {
+    resetSelection();
+    showMessage(bookingMessage, "Выбранный слот только что заняли, выберите другой", "error");
+  }
+  renderExperts();
+};
+
+const removeSlots = (slotIds) => {
+  const ids = new Set(slotIds);
+  expertsCache.forEach((expert) => {
+    expert.slots = expert.slots.filter((slot) => !ids.has(slot.id));
+  });
+  if (selectedSlotId && ids.has(selectedSlotId)) {
+    resetSelection();
+    showMessage(bookingMessage, "Выбранный слот удалён, выберите другой", "error");
+  }
+  renderExperts();
+};
+
+const upsertAvailableSlots = (slots) => {
+  const horizonEnd = Date.now() + HORIZON_DAYS * 24 * 60 * 60 * 1000;
+  let unknownExpert = false;
+  slots.forEach((slot) => {
+    const expert = expertsCache.find((item) => item.id === slot.expert_id);
+    if (!expert) {
+      // У эксперта раньше не было свободных слотов, его карточки нет в кэше
+      unknownExpert = true;
+      return;
+    }
+    expert.slots = expert.slots.filter((item) => item.id !== slot.id);
+    // start_at приходит в UTC без пояса — как и в expandAvailability
+    const startsAt = Date.parse(`${slot.start_at}Z`);
+    if (startsAt >= Date.now() && startsAt <= horizonEnd) {
+      expert.slots.push({ ...slot, is_available: true });
+      expert.slots.sort((a, b) => new Date(a.start_at) - new Date(b.start_at));
+    }
+  });
+  if (unknownExpert) {
+    loadExperts();
+    return;
+  }
   renderExperts();
 };
 
+// Живые обновления расписания: сервер присылает только изменившиеся слоты
+const connectAvailabilityEvents = () => {
+  if (!window.EventSource) return;
+  liveUpdates = true;
+  const source = new EventSource("/events/availability");
+  let connectedOnce = false;
+  source.addEventListener("open", () => {
+    // После переподключения часть событий могла потеряться — перечитываем расписание
+    if (connectedOnce) loadExperts();
+    connectedOnce = true;
+  });
+  const onData = (handler) => (event) => handler(JSON.parse(event.data));
+  source.addEventListener("booked", onData((data) => markSlotsTaken(data.slot_ids)));
+  source.addEventListener("deleted", onData((data) => removeSlots(data.slot_ids)));
+  source.addEventListener("created", onData((data) => upsertAvailableSlots(data.slots)));
+  source.addEventListener("freed", onData((data) => upsertAvailableSlots(data.slots)));
+  source.addEventListener("updated", onData((data) => upsertAvailableSlots(data.slots)));
+  source.addEventListener("experts_changed", () => loadExperts());
+  source.addEventListener("resync", () => loadExperts());
+};
+
+// Поиск ближайших свободных слотов выполняется на сервере, без перебора всего расписания
+const SEARCH_LIMIT = 10;
+
+const renderSearchResults = (slots) => {
+  searchResults.innerHTML = "";
+  if (slots.length === 0) {
+    searchResults.innerHTML = "<p>Подходящих свободных слотов не найдено</p>";
+    return;
+  }
+  slots.forEach((slot) => {
+    const slotBox = document.createElement("div");
+    slotBox.className = "slot";
+    slotBox.innerHTML = `
+      <div class="slot-header">
+        <span>${formatDateTime(slot.start_at)}</span>
+        <span class="slot-duration">${slot.duration_minutes} мин</span>
+      </div>
+      <p>${slot.full_name} — ${slot.expertise_area}</p>
+      <div class="slot-actions">
+        <button type="button" class="slot-select-btn">Выбрать</button>
+      </div>
+    `;
+    slotBox.querySelector(".slot-select-btn").addEventListener("click", () => {
+      const expert = expertsCache.find((item) => item.id === slot.expert_id) || slot;
+      selectSlot({ ...slot, is_available: true }, expert);
+      bookingForm.scrollIntoView({ behavior: "smooth" });
+    });
+    searchResults.appendChild(slotBox);
+  });
+};
+
+searchForm.addEventListener("submit", async (event) => {
+  event.preventDefault();
+  const params = new URLSearchParams({ limit: SEARCH_LIMIT });
+  const query = document.getElementById("searchQuery").value.trim();
+  const dateFrom = document.getElementById("searchDateFrom").value;
+  const dateTo = document.getElementById("searchDateTo").value;
+  if (query) params.set("q", query);
+  // Границы дней — по местному времени студента, на сервер уходят в UTC
+  if (dateFrom) params.set("date_from", new Date(`${dateFrom}T00:00:00`).toISOString());
+  if (dateTo) params.set("date_to", new Date(`${dateTo}T23:59:59`).toISOString());
+  try {
+    renderSearchResults(await apiRequest(`/slots/search?${params}`));
+  } catch (error) {
+    searchResults.innerHTML = "";
+    showMessage(searchResults, error.message, "error");
+  }
+});
+
 const showBookingPopup = (bookingId, cancellationCode, bookingData) => {
   popupBookingId.textContent = bookingId;
   popupCancellationCode.textContent = cancellationCode;
@@ -208,11 +358,8 @@ bookingForm.addEventListener("submit", async (event) => {
     });
     showBookingPopup(booking.id, booking.cancellation_code, payload);
     bookingForm.reset();
-    selectedSlotId = null;
-    selectedSlotData = null;
-    bookButton.disabled = true;
-    selectedSlotInfo.setAttribute("hidden", "");
-    await loadExperts();
+    resetSelection();
+    markSlotsTaken([booking.slot_id]);
   } catch (error) {
     showMessage(bookingMessage, error.message, "error");
   } finally {
@@ -228,7 +375,9 @@ cancelForm.addEventListener("submit", async (event) => {
     await apiRequest(`/bookings/${bookingId}?cancellation_code=${code}`, { method: "DELETE" });
     showMessage(cancelMessage, "Запись удалена", "success");
     cancelForm.reset();
-    await loadExperts();
+    if (!liveUpdates) {
+      await loadExperts();
+    }
   } catch (error) {
     showMessage(cancelMessage, error.message, "error");
   }
@@ -269,4 +418,4 @@ downloadBookingBtn.addEventListener("click", downloadBookingInfo);
 // Убедимся, что попап скрыт при загрузке страницы
 closePopup();
 
-loadExperts();
+loadExperts().then(connectAvailabilityEvents);